@@ -0,0 +1,125 @@
+import os
+from datetime import date, datetime
+from app.leaderboard import ALL_LEAGUES, week_key
+from app.ratings import STAT_FIELDS
+
+# Materialised per-player season aggregates. Each (player, season, league)
+# document, plus one per (player, season) across all leagues, holds running
+# sums and counts that are only ever changed with $inc: ingesting a match adds
+# its contribution and a correction adds the difference between the new and
+# old versions, so documents never need re-aggregating from match history.
+# Sums are also bucketed by ISO week, which is what the rolling averages over
+# the last ROLLING_WEEKS active weeks are read from.
+SEASON_START_MONTH = int(os.getenv("SEASON_START_MONTH", "8"))
+ROLLING_WEEKS = 4
+FULL_MATCH_MINUTES = 90
+
+
+def season_key(match_date):
+    """Season label such as 2024-25 for a date, datetime or YYYY-MM-DD string"""
+    if isinstance(match_date, str):
+        match_date = date.fromisoformat(match_date[:10])
+    elif isinstance(match_date, datetime):
+        match_date = match_date.date()
+    start = match_date.year if match_date.month >= SEASON_START_MONTH else match_date.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def aggregate_id(player_id, season, league=ALL_LEAGUES):
+    return f"{player_id}|{season}|{league}"
+
+
+def match_minutes(match_duration, extra_time=0):
+    """Minutes played from the widget's MM:SS clock, plus added time"""
+    try:
+        minutes, _, seconds = str(match_duration or "0").partition(":")
+        played = int(minutes) + int(seconds or 0) / 60
+    except ValueError:
+        played = FULL_MATCH_MINUTES
+    return round(played + (extra_time or 0), 2)
+
+
+def _increments(match, sign):
+    week = match.get("week") or week_key(match["match_date"])
+    rating = match["performance_rating"] * sign
+    minutes = match_minutes(match.get("match_duration"), match.get("extra_time")) * sign
+    increments = {
+        "matches": sign,
+        "minutes": minutes,
+        "rating_sum": rating,
+        f"weeks.{week}.matches": sign,
+        f"weeks.{week}.minutes": minutes,
+        f"weeks.{week}.rating_sum": rating,
+    }
+    for field in STAT_FIELDS:
+        value = match["stats"].get(field, 0) * sign
+        increments[f"stats.{field}"] = value
+        increments[f"weeks.{week}.stats.{field}"] = value
+    return increments
+
+
+def changes(old=None, new=None):
+    """(_id, increments, defaults) updates that move aggregates from old to new.
+
+    Pass only new for an ingested match and both for a correction; fields the
+    correction did not change cancel out and are left untouched.
+    """
+    merged = {}
+    for match, sign in ((old, -1), (new, 1)):
+        if match is None:
+            continue
+        player_id = str(match["player_id"])
+        season = season_key(match["match_date"])
+        for league in (match["league"], ALL_LEAGUES):
+            _id = aggregate_id(player_id, season, league)
+            defaults = {"player_id": player_id, "season": season, "league": league}
+            increments = merged.setdefault(_id, ({}, defaults))[0]
+            for path, value in _increments(match, sign).items():
+                increments[path] = increments.get(path, 0) + value
+
+    updates = []
+    for _id, (increments, defaults) in merged.items():
+        increments = {path: round(value, 4) for path, value in increments.items() if round(value, 4)}
+        if increments:
+            updates.append((_id, increments, defaults))
+    return updates
+
+
+def _per_90(stats, minutes):
+    if minutes <= 0:
+        return {field: 0.0 for field in stats}
+    return {field: round(value * FULL_MATCH_MINUTES / minutes, 2) for field, value in stats.items()}
+
+
+def summarize(document):
+    """Totals, averages, per-90 rates and rolling form from one aggregate document"""
+    if not document:
+        return None
+    matches = document.get("matches", 0)
+    minutes = document.get("minutes", 0)
+    stats = {field: document.get("stats", {}).get(field, 0) for field in STAT_FIELDS}
+
+    active = sorted(week for week, bucket in document.get("weeks", {}).items() if bucket.get("matches", 0) > 0)
+    recent = [document["weeks"][week] for week in active[-ROLLING_WEEKS:]]
+    recent_matches = sum(bucket["matches"] for bucket in recent)
+    recent_minutes = sum(bucket.get("minutes", 0) for bucket in recent)
+    recent_stats = {field: sum(bucket.get("stats", {}).get(field, 0) for bucket in recent) for field in STAT_FIELDS}
+
+    return {
+        "player_id": document["player_id"],
+        "season": document["season"],
+        "league": document["league"],
+        "matches": matches,
+        "minutes": round(minutes, 1),
+        "average_rating": round(document.get("rating_sum", 0) / matches, 2) if matches else None,
+        "stats": stats,
+        "per_match": {field: round(value / matches, 2) for field, value in stats.items()} if matches else {},
+        "per_90": _per_90(stats, minutes),
+        "rolling": {
+            "weeks": active[-ROLLING_WEEKS:],
+            "matches": recent_matches,
+            "average_rating": (round(sum(bucket["rating_sum"] for bucket in recent) / recent_matches, 2)
+                               if recent_matches else None),
+            "per_90": _per_90(recent_stats, recent_minutes),
+        },
+    }
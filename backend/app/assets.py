@@ -0,0 +1,106 @@
+import os
+import json
+import hashlib
+import mimetypes
+from pathlib import Path
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from app.compression import compress_variants, choose_encoding
+
+# Fingerprinted static assets. At startup every CSS/JS file under static/ is
+# copied to static/dist/ with a content hash in its name, alongside .gz/.br
+# siblings compressed once at maximum effort, and manifest.json maps source
+# paths to the hashed names. Templates link assets through asset(), so a
+# changed file gets a new URL and the old one can be cached forever.
+ASSET_EXTENSIONS = {".css", ".js"}
+ASSET_HASH_LENGTH = 12
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+manifest = {}
+
+
+def _fingerprint(relative, data):
+    digest = hashlib.sha256(data).hexdigest()[:ASSET_HASH_LENGTH]
+    return relative.with_name(f"{relative.stem}.{digest}{relative.suffix}").as_posix()
+
+
+def build_assets(source="static", target="static/dist"):
+    """Fingerprint and precompress assets, returning the new manifest.
+
+    Unchanged files keep their hashed names and are not rewritten. Outputs
+    from the previous build are kept so pages cached before a deploy still
+    resolve; anything older is removed.
+    """
+    source, target = Path(source), Path(target)
+    manifest_path = target / "manifest.json"
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    built = {}
+    for path in sorted(source.rglob("*")):
+        if path.suffix not in ASSET_EXTENSIONS or target in path.parents or not path.is_file():
+            continue
+        relative = path.relative_to(source)
+        data = path.read_bytes()
+        hashed = _fingerprint(relative, data)
+        built[relative.as_posix()] = hashed
+        output = target / hashed
+        if output.exists():
+            continue
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # The uncompressed file goes last: its presence marks the asset as built
+        for encoding, body in sorted(compress_variants(data).items(), key=lambda item: item[0] == "identity"):
+            variant = output.with_name(output.name + ENCODING_SUFFIXES.get(encoding, ""))
+            temp = variant.with_name(variant.name + ".tmp")
+            temp.write_bytes(body)
+            os.replace(temp, variant)
+
+    keep = set(built.values()) | set(previous.values())
+    for path in target.rglob("*"):
+        if path.is_file() and path != manifest_path:
+            name = path.relative_to(target).as_posix()
+            for suffix in ENCODING_SUFFIXES.values():
+                name = name.removesuffix(suffix)
+            if name not in keep:
+                path.unlink()
+
+    target.mkdir(parents=True, exist_ok=True)
+    temp = manifest_path.with_name("manifest.json.tmp")
+    temp.write_text(json.dumps(built, indent=2, sort_keys=True))
+    os.replace(temp, manifest_path)
+    manifest.clear()
+    manifest.update(built)
+    return built
+
+
+def asset(path):
+    """URL for a static asset, fingerprinted when it is in the manifest"""
+    path = path.lstrip("/")
+    hashed = manifest.get(path)
+    return f"/static/dist/{hashed}" if hashed else f"/static/{path}"
+
+
+class AssetFiles(StaticFiles):
+    """Serves fingerprinted assets with immutable caching, preferring a precompressed sibling"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        available = {"identity": full_path}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            variant = f"{full_path}{suffix}"
+            if os.path.exists(variant):
+                available[encoding] = variant
+        encoding = choose_encoding(request_headers.get("accept-encoding"), available)
+
+        # The media type follows the original file, not the .gz/.br name
+        served = available[encoding]
+        response = FileResponse(served, status_code=status_code, media_type=mimetypes.guess_type(full_path)[0],
+                                stat_result=stat_result if served == full_path else os.stat(served))
+        response.headers["Cache-Control"] = ASSET_CACHE_CONTROL
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,243 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from pathlib import Path
+import bson
+from bson.objectid import ObjectId
+from app.metrics import WRITE_QUEUE_DEPTH, WRITE_QUEUE_JOURNALED
+
+BATCH_MAX_SIZE = 500
+BATCH_MAX_DELAY = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWriter:
+    """Group-commit writer: concurrent submit() calls are coalesced into one
+    insert_many, and each caller resumes once its batch has been written.
+
+    The returned flag tells the caller whether its document was a duplicate
+    (its _id already existed), which makes retried submissions harmless.
+    """
+
+    def __init__(self, collection, max_size=BATCH_MAX_SIZE, max_delay=BATCH_MAX_DELAY):
+        self.collection = collection
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.batches = 0
+        self.written = 0
+        self._pending = []
+        self._flusher = None
+
+    async def submit(self, document):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_size:
+            await self.flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        await self.flush()
+
+    async def flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            duplicates = await self.collection.insert_many([document for document, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.written += len(batch) - len(duplicates)
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(index in duplicates)
+
+
+# Write-behind queue for fire-and-forget inserts such as contact messages.
+# put() only enqueues, so request latency does not depend on the database; a
+# background task drains the queue in insert_many batches. Documents get their
+# _id when queued, which makes every write idempotent: anything that cannot be
+# written (database down, queue full) is appended to a local BSON journal and
+# replayed, possibly more than once, when writes succeed again.
+QUEUE_CAPACITY = int(os.getenv("WRITE_QUEUE_CAPACITY", "10000"))
+QUEUE_RETRY_INTERVAL = float(os.getenv("WRITE_QUEUE_RETRY_INTERVAL", "5"))
+
+
+class Journal:
+    """Append-only file of BSON documents. replay() works on a claimed copy so
+    appends can continue while it is written back."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.claimed_path = Path(f"{path}.replay")
+        self._lock = threading.Lock()
+
+    def append(self, documents):
+        data = b"".join(bson.encode(document) for document in documents)
+        with self._lock, open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self):
+        return self.claimed_path.exists() or self.path.exists()
+
+    def claim(self):
+        """Return the file to replay: an unfinished claim first, else the current journal"""
+        with self._lock:
+            if not self.claimed_path.exists():
+                if not self.path.exists():
+                    return None
+                os.replace(self.path, self.claimed_path)
+            return self.claimed_path
+
+    def read(self, path, offset, count):
+        """Up to count documents from offset and the offset after them; a torn
+        final record (crash mid-append) is ignored"""
+        documents = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while len(documents) < count:
+                header = f.read(4)
+                if len(header) < 4:
+                    break
+                size = int.from_bytes(header, "little")
+                body = f.read(size - 4)
+                if len(body) < size - 4:
+                    break
+                documents.append(bson.decode(header + body))
+                offset += size
+        return documents, offset
+
+    def release(self, path):
+        os.remove(path)
+
+
+class WriteBehindQueue:
+    """Bounded in-memory queue written to a collection by a background task"""
+
+    def __init__(self, name, collection, journal_path, capacity=QUEUE_CAPACITY, batch_size=BATCH_MAX_SIZE,
+                 max_delay=BATCH_MAX_DELAY, retry_interval=QUEUE_RETRY_INTERVAL):
+        self.name = name
+        self.collection = collection
+        self.journal = Journal(journal_path)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retry_interval = retry_interval
+        self.healthy = True
+        self.written = 0
+        self.journaled = 0
+        self.replayed = 0
+        self._queue = asyncio.Queue(capacity)
+        self._inflight = []
+        self._retry_at = 0
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, document):
+        """Queue a document for insertion; spills to the journal when the queue is full"""
+        document.setdefault("_id", self.collection.to_id(str(ObjectId())))
+        try:
+            self._queue.put_nowait(document)
+        except asyncio.QueueFull:
+            await self._spill([document])
+        WRITE_QUEUE_DEPTH.labels(self.name).set(self._queue.qsize())
+
+    def stats(self):
+        return {"queued": self._queue.qsize(), "healthy": self.healthy, "written": self.written,
+                "journaled": self.journaled, "replayed": self.replayed, "journal_pending": self.journal.pending()}
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                self._inflight = [await asyncio.wait_for(self._queue.get(), self.retry_interval)]
+            except asyncio.TimeoutError:
+                self._inflight = []
+            batch = self._inflight
+            if batch:
+                # Give concurrent requests a moment to join the batch
+                await asyncio.sleep(self.max_delay)
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                WRITE_QUEUE_DEPTH.labels(self.name).set(self._queue.qsize())
+            if time.monotonic() >= self._retry_at and self.journal.pending():
+                await self._replay()
+            if batch:
+                await self._write(batch)
+            self._inflight = []
+
+    async def _write(self, batch):
+        if not self.healthy:
+            # Journal rather than wait on a database that just failed; the
+            # next successful replay restores direct writes
+            await self._spill(batch)
+            return
+        try:
+            await self.collection.insert_many(batch)
+        except Exception as e:
+            self._failed(e)
+            await self._spill(batch)
+            return
+        self.written += len(batch)
+
+    async def _spill(self, documents):
+        await asyncio.to_thread(self.journal.append, documents)
+        self.journaled += len(documents)
+        WRITE_QUEUE_JOURNALED.labels(self.name).inc(len(documents))
+
+    def _failed(self, error):
+        if self.healthy:
+            logger.warning("Write-behind queue journaling", extra={"queue": self.name, "error": str(error)})
+        self.healthy = False
+        self._retry_at = time.monotonic() + self.retry_interval
+
+    async def _replay(self):
+        path = await asyncio.to_thread(self.journal.claim)
+        offset = 0
+        while path is not None:
+            documents, next_offset = await asyncio.to_thread(self.journal.read, path, offset, self.batch_size)
+            if not documents:
+                await asyncio.to_thread(self.journal.release, path)
+                break
+            try:
+                # Documents written by an earlier, interrupted replay come back as duplicates
+                await self.collection.insert_many(documents)
+            except Exception as e:
+                self._failed(e)
+                return
+            self.replayed += len(documents)
+            offset = next_offset
+        if not self.healthy:
+            logger.info("Write-behind queue recovered", extra={"queue": self.name, "replayed": self.replayed})
+        self.healthy = True
+
+    async def close(self):
+        """Stop the worker, then write or journal everything still queued"""
+        # The flag covers a cancellation that wait_for swallows when an item
+        # arrives at the same moment
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # The batch the worker held may or may not have been written; its
+        # _ids make writing it again harmless
+        batch = self._inflight
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._write(batch)
@@ -0,0 +1,51 @@
+import time
+import threading
+from collections import OrderedDict
+from app.metrics import CACHE_ENTRIES, CACHE_LOOKUPS
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a TTL"""
+
+    def __init__(self, name, maxsize=10000, ttl=300):
+        """name labels the cache's hit, miss and size metrics"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hit = CACHE_LOOKUPS.labels(name, "hit")
+        self._miss = CACHE_LOOKUPS.labels(name, "miss")
+        self._entries = CACHE_ENTRIES.labels(name)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                    self._entries.set(len(self._data))
+                self._miss.inc()
+                return default
+            self._data.move_to_end(key)
+            self._hit.inc()
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            self._entries.set(len(self._data))
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            self._entries.set(len(self._data))
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._entries.set(0)
@@ -0,0 +1,118 @@
+import os
+import gzip
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content negotiation for precompressed bodies. Brotli is optional: without
+# the package only gzip variants are produced and advertised.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ENCODING_PREFERENCE = ("br", "gzip", "identity")
+
+
+def compress_variants(body):
+    """Every encoding of body this server can offer, compressed once at maximum effort"""
+    variants = {"identity": body, "gzip": gzip.compress(body, GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    # A compressed variant that is not smaller is never worth sending
+    return {encoding: data for encoding, data in variants.items()
+            if encoding == "identity" or len(data) < len(body)}
+
+
+def accepted_encodings(accept_encoding):
+    """Encodings a client accepts, from an Accept-Encoding header"""
+    accepted = {"identity"}
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        try:
+            quality = float(params.strip()[2:]) if params.strip().startswith("q=") else 1.0
+        except ValueError:
+            quality = 1.0
+        if quality > 0:
+            accepted.add(token)
+        elif token == "identity":
+            accepted.discard(token)
+    return accepted
+
+
+def choose_encoding(accept_encoding, available):
+    """Best available encoding for a request; identity when nothing better is accepted"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+# Dynamic responses are compressed per request, so they use cheaper settings
+# than the precompressed variants above.
+DYNAMIC_GZIP_LEVEL = 6
+DYNAMIC_BROTLI_QUALITY = 4
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "text/")
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=DYNAMIC_BROTLI_QUALITY)
+    return gzip.compress(body, DYNAMIC_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compress complete responses of at least minimum_size bytes with br or gzip.
+
+    Streamed responses (NDJSON, server-sent events) pass through untouched so
+    they are not buffered, as do responses that are already encoded or carry
+    an ETag, whose validator must keep describing the bytes sent.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start["headers"])
+            body = message.get("body", b"")
+            if (message["type"] != "http.response.body" or message.get("more_body", False)
+                    or len(body) < self.minimum_size or "content-encoding" in headers or "etag" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                await send(response_start)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            response_start["headers"] = headers.raw
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,222 @@
+import os
+import asyncio
+import functools
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.metrics import DB_CALL_LATENCY, DB_CALLS_IN_FLIGHT
+
+DUPLICATE_KEY = 11000
+
+# Blocking driver calls run on a dedicated thread pool so the event loop never
+# waits on a Mongo round-trip. The semaphore bounds how many calls may be queued
+# or in flight at once, so a slow cluster applies back-pressure to the routes
+# instead of piling up unbounded work.
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", "16"))
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", str(DB_MAX_WORKERS * 4)))
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="db")
+_semaphore = None
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(DB_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call on the db thread pool"""
+    DB_CALLS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        async with _get_semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        DB_CALLS_IN_FLIGHT.dec()
+        DB_CALL_LATENCY.observe(time.perf_counter() - start)
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=True)
+
+
+class MongoCollection:
+    """Async facade over a pymongo collection"""
+
+    source = "mongodb"
+
+    def __init__(self, collection, object_ids=True):
+        self.collection = collection
+        self.object_ids = object_ids
+
+    def to_id(self, value):
+        if not self.object_ids:
+            return str(value) if value else None
+        try:
+            return ObjectId(value)
+        except (InvalidId, TypeError):
+            return None
+
+    async def find_one(self, filter, projection=None):
+        return await run_db(self.collection.find_one, filter, projection)
+
+    async def find(self, filter=None, projection=None, limit=0, sort=None):
+        def _find():
+            cursor = self.collection.find(filter or {}, projection, limit=limit)
+            return list(cursor.sort(sort) if sort else cursor)
+        return await run_db(_find)
+
+    async def find_page(self, cursor=None, limit=50, fields=None):
+        """Return (documents, next_cursor) in _id order, starting after cursor"""
+        filter = {}
+        if cursor:
+            after = self.to_id(cursor)
+            if after is None:
+                raise ValueError("Invalid cursor")
+            filter["_id"] = {"$gt": after}
+        projection = {field: 1 for field in fields} if fields else None
+
+        def _page():
+            return list(self.collection.find(filter, projection).sort("_id", 1).limit(limit))
+
+        documents = await run_db(_page)
+        next_cursor = str(documents[-1]["_id"]) if len(documents) == limit else None
+        return documents, next_cursor
+
+    async def batches(self, filter=None, projection=None, batch_size=1000):
+        """Yield matching documents batch_size at a time from one server-side cursor"""
+        cursor = self.collection.find(filter or {}, projection, batch_size=batch_size)
+        try:
+            while True:
+                batch = await run_db(lambda: list(itertools.islice(cursor, batch_size)))
+                if batch:
+                    yield batch
+                if len(batch) < batch_size:
+                    break
+        finally:
+            await run_db(cursor.close)
+
+    async def insert_one(self, document):
+        result = await run_db(self.collection.insert_one, document)
+        return result.inserted_id
+
+    async def insert_many(self, documents):
+        """Unordered insert; returns the indexes of documents whose _id already existed"""
+        try:
+            await run_db(self.collection.insert_many, documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY for error in errors):
+                raise
+            return {error["index"] for error in errors}
+        return set()
+
+    async def update_one(self, filter, update):
+        result = await run_db(self.collection.update_one, filter, update)
+        return result.modified_count
+
+    async def set_many(self, updates):
+        """Apply (_id, fields) pairs as one unordered bulk $set"""
+        if not updates:
+            return 0
+        operations = [UpdateOne({"_id": _id}, {"$set": fields}) for _id, fields in updates]
+        result = await run_db(self.collection.bulk_write, operations, ordered=False)
+        return result.modified_count
+
+    async def increment_many(self, updates):
+        """Upsert (_id, increments, defaults) triples as one unordered bulk $inc"""
+        if not updates:
+            return 0
+        operations = [UpdateOne({"_id": _id}, {"$inc": increments, "$setOnInsert": defaults}, upsert=True)
+                      for _id, increments, defaults in updates]
+        await run_db(self.collection.bulk_write, operations, ordered=False)
+        return len(updates)
+
+
+def _sort(documents, sort):
+    for field, direction in reversed(sort):
+        documents.sort(key=lambda document: (document.get(field) is not None, document.get(field)),
+                       reverse=direction < 0)
+    return documents
+
+
+def _project(document, projection):
+    if not projection:
+        return dict(document)
+    included = {k for k, v in projection.items() if v}
+    if included:
+        return {k: v for k, v in document.items() if k in included or (k == "_id" and projection.get("_id", 1))}
+    excluded = {k for k, v in projection.items() if not v}
+    return {k: v for k, v in document.items() if k not in excluded}
+
+
+class JsonCollection:
+    """Async facade over the local JSON Lines store, used when MongoDB is not available"""
+
+    source = "json"
+
+    def __init__(self, store):
+        self.store = store
+
+    def to_id(self, value):
+        return str(value) if value else None
+
+    async def find_one(self, filter, projection=None):
+        results = await run_db(self.store.find, filter, 1)
+        return _project(results[0], projection) if results else None
+
+    async def find(self, filter=None, projection=None, limit=0, sort=None):
+        if sort:
+            results = _sort(await run_db(self.store.find, filter, 0), sort)
+            results = results[:limit] if limit else results
+        else:
+            results = await run_db(self.store.find, filter, limit)
+        return [_project(document, projection) for document in results]
+
+    async def find_page(self, cursor=None, limit=50, fields=None):
+        """Return (documents, next_cursor) in insertion order, starting after cursor"""
+        try:
+            position = int(cursor) if cursor else 0
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        if position < 0:
+            raise ValueError("Invalid cursor")
+        documents, next_position = await run_db(self.store.page, position, limit)
+        projection = {field: 1 for field in fields} if fields else None
+        next_cursor = str(next_position) if next_position is not None else None
+        return [_project(document, projection) for document in documents], next_cursor
+
+    async def batches(self, filter=None, projection=None, batch_size=1000):
+        """Yield matching documents batch_size at a time in insertion order"""
+        position = 0
+        while position is not None:
+            documents, position = await run_db(self.store.scan, filter or {}, position, batch_size)
+            if documents:
+                yield [_project(document, projection) for document in documents]
+
+    async def insert_one(self, document):
+        return await run_db(self.store.insert, document)
+
+    async def insert_many(self, documents):
+        """Insert documents; returns the indexes of documents whose _id already existed"""
+        return await run_db(self.store.insert_many, documents)
+
+    async def update_one(self, filter, update):
+        return await run_db(self.store.update, filter, update)
+
+    async def set_many(self, updates):
+        """Apply (_id, fields) pairs in one locked pass over the log"""
+        return await run_db(self.store.set_many, updates)
+
+    async def increment_many(self, updates):
+        """Upsert (_id, increments, defaults) triples in one locked pass over the log"""
+        if not updates:
+            return 0
+        return await run_db(self.store.increment_many, updates)
@@ -0,0 +1,233 @@
+import os
+import io
+import csv
+import asyncio
+from datetime import datetime, time
+from app.models import MatchStatLine
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+# Bulk export of players and match stats as CSV or Parquet. Documents are read
+# EXPORT_BATCH_SIZE at a time and each batch is encoded and sent before the
+# next is fetched, so memory stays flat however large the export. Parquet
+# output is written one row group per batch. Columns have fixed types so every
+# batch shares one schema; values that do not fit their column become empty.
+# pyarrow is optional: without it only CSV is offered.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_FORMATS = ("csv", "parquet")
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "parquet": "application/vnd.apache.parquet"}
+
+# Passwords are never exportable; email only when explicitly asked for
+PLAYER_COLUMNS = {
+    "id": "string", "player_id": "string", "userType": "string", "firstName": "string",
+    "middleName": "string", "lastName": "string", "email": "string", "dob": "string", "gender": "string",
+    "nationality": "string", "photo": "string", "preferredPositionCategory": "string",
+    "preferredPosition": "string", "otherPositions": "list", "dominantFoot": "string", "height": "int",
+    "weight": "int", "league": "string", "club": "string", "created_at": "timestamp",
+}
+PRIVATE_PLAYER_COLUMNS = ("email",)
+# Players registered through the web form have no player_id; their id is _id
+PLAYER_FALLBACKS = {"player_id": "id"}
+MATCH_STATS_COLUMNS = {
+    "id": "string", "player_id": "string", "home_team": "string", "away_team": "string",
+    "match_date": "string", "week": "string", "league": "string", "performance_rating": "float",
+    "match_duration": "string", "extra_time": "int", "created_at": "timestamp",
+    **{f"stats.{stat}": "int" for stat in MatchStatLine().model_dump()},
+}
+
+
+def export_formats():
+    return EXPORT_FORMATS if pyarrow is not None else ("csv",)
+
+
+def select_columns(columns, fields=None, private=()):
+    """Resolve a comma separated field list; private columns are only included when named.
+    Raises ValueError listing unknown fields."""
+    if not fields:
+        return [column for column in columns if column not in private]
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def projection(columns):
+    """Top-level fields to fetch for a set of (possibly dotted) columns"""
+    fields = {column.split(".", 1)[0] for column in columns if column != "id"}
+    return {field: 1 for field in fields}
+
+
+def player_filter(source, league=None, created_from=None, created_to=None):
+    """Filter on league and an inclusive created_at date range"""
+    filter = {}
+    if league:
+        filter["league"] = league
+    bounds = {}
+    if created_from:
+        bounds["$gte"] = datetime.combine(created_from, time.min)
+    if created_to:
+        bounds["$lte"] = datetime.combine(created_to, time.max)
+    if bounds:
+        # The JSON store keeps datetimes as ISO strings, which sort the same way
+        filter["created_at"] = bounds if source == "mongodb" else {
+            operator: value.isoformat() for operator, value in bounds.items()}
+    return filter
+
+
+def match_stats_filter(league=None, date_from=None, date_to=None, player_id=None):
+    """Filter on league, player and an inclusive match_date range"""
+    filter = {}
+    if league:
+        filter["league"] = league
+    if player_id:
+        filter["player_id"] = str(player_id)
+    bounds = {}
+    if date_from:
+        bounds["$gte"] = date_from.isoformat()
+    if date_to:
+        bounds["$lte"] = date_to.isoformat()
+    if bounds:
+        filter["match_date"] = bounds
+    return filter
+
+
+def _lookup(document, column):
+    if column == "id":
+        return document.get("_id")
+    value = document
+    for part in column.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _coerce(value, kind):
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "int":
+            return int(float(value))
+        if kind == "float":
+            return float(value)
+        if kind == "timestamp":
+            return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+        if kind == "list":
+            return [str(item) for item in value] if isinstance(value, (list, tuple)) else [str(value)]
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+class CsvEncoder:
+    def __init__(self, columns, types):
+        self.columns = columns
+        self.types = [types[column] for column in columns]
+        self.started = False
+
+    def encode(self, documents):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self.started:
+            writer.writerow(self.columns)
+            self.started = True
+        for document in documents:
+            row = []
+            for column, kind in zip(self.columns, self.types):
+                value = _coerce(_lookup(document, column), kind)
+                if value is None:
+                    row.append("")
+                elif kind == "list":
+                    row.append("; ".join(value))
+                elif kind == "timestamp":
+                    row.append(value.isoformat())
+                else:
+                    row.append(value)
+            writer.writerow(row)
+        return buffer.getvalue().encode("utf-8")
+
+    def finish(self):
+        return b"" if self.started else self.encode([])
+
+
+class _Sink:
+    """Write-only file object that hands written bytes back on drain"""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    ARROW_TYPES = {"string": "string", "int": "int64", "float": "float64"}
+
+    def __init__(self, columns, types):
+        self.columns = columns
+        self.types = [types[column] for column in columns]
+        self.schema = pyarrow.schema([(column, self._arrow_type(kind)) for column, kind in zip(columns, self.types)])
+        self.sink = _Sink()
+        self.writer = parquet.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    @staticmethod
+    def _arrow_type(kind):
+        if kind == "list":
+            return pyarrow.list_(pyarrow.string())
+        if kind == "timestamp":
+            return pyarrow.timestamp("ms")
+        return pyarrow.type_for_alias(ParquetEncoder.ARROW_TYPES[kind])
+
+    def encode(self, documents):
+        arrays = [[_coerce(_lookup(document, column), kind) for document in documents]
+                  for column, kind in zip(self.columns, self.types)]
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(values, type=field.type) for values, field in zip(arrays, self.schema)],
+            schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self):
+        self.writer.close()
+        return self.sink.drain()
+
+
+async def export_stream(collection, filter, columns, types, format, batch_size=EXPORT_BATCH_SIZE, fallbacks=None):
+    """Yield the export as encoded chunks, one per batch of documents. fallbacks
+    maps a column to the column whose value it takes when the document has none."""
+    encoder = (ParquetEncoder if format == "parquet" else CsvEncoder)(columns, types)
+    fallbacks = {column: source for column, source in (fallbacks or {}).items() if column in columns}
+    async for documents in collection.batches(filter, projection(columns), batch_size):
+        for document in documents:
+            for column, source in fallbacks.items():
+                if _lookup(document, column) is None:
+                    document[column] = _lookup(document, source)
+        # Encoding a batch is CPU work, so keep it off the event loop
+        data = await asyncio.to_thread(encoder.encode, documents)
+        if data:
+            yield data
+    yield await asyncio.to_thread(encoder.finish)
@@ -0,0 +1,142 @@
+import os
+import csv
+import json
+import time
+import asyncio
+from datetime import datetime
+from pydantic import ValidationError
+from app.models import PlayerImport
+from app.validation import validation_message
+
+# Bulk roster import. Rows are read lazily from CSV or NDJSON and handled
+# IMPORT_CHUNK_SIZE at a time: each chunk is validated, checked against
+# existing players with one email/name query, and written with one unordered
+# insert_many. Only the current chunk is held in memory, and per-row errors
+# are yielded as they are found instead of being collected.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_FORMATS = ("csv", "ndjson")
+DUPLICATE_FIELDS = {"email": 1, "firstName": 1, "lastName": 1}
+
+
+def import_format(filename, declared=None):
+    """Resolve the roster format from an explicit value or the file extension"""
+    if declared:
+        return declared if declared in IMPORT_FORMATS else None
+    suffix = os.path.splitext(filename or "")[1].lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return None
+
+
+def read_rows(text, format):
+    """Yield (line number, row) pairs from a text stream; row is an error string when unparseable"""
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Blank cells count as missing so optional fields take their defaults
+            yield reader.line_num, {key.strip(): value.strip() for key, value in row.items()
+                                    if key and value and value.strip()}
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, f"Invalid JSON: {e.msg}"
+            continue
+        yield number, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def player_document(player: PlayerImport):
+    """The stored shape of an imported player, matching API registrations"""
+    document = player.model_dump(by_alias=True, exclude_none=True)
+    document["middleName"] = player.middle_name or ""
+    document["created_at"] = datetime.utcnow()
+    return document
+
+
+def _next_chunk(rows, size):
+    """Parse and validate up to size rows; returns (read, valid, errors)"""
+    read, valid, errors = 0, [], []
+    for number, row in rows:
+        read += 1
+        if isinstance(row, str):
+            errors.append({"row": number, "error": row})
+        else:
+            try:
+                valid.append((number, player_document(PlayerImport(**row))))
+            except ValidationError as e:
+                errors.append({"row": number, "error": validation_message(e)})
+        if read >= size:
+            break
+    return read, valid, errors
+
+
+def _duplicate_filter(documents):
+    clauses = []
+    for document in documents:
+        if document.get("email"):
+            clauses.append({"email": document["email"]})
+        clauses.append({"firstName": document["firstName"], "lastName": document["lastName"]})
+    return {"$or": clauses}
+
+
+async def import_players(collection, rows, chunk_size=IMPORT_CHUNK_SIZE, on_insert=None):
+    """Import (line number, row) pairs, yielding {"row", "error"} dicts for rejected rows
+    and a {"progress": ...} dict after every chunk. on_insert(_id, document) is
+    called for each stored player."""
+    summary = {"rows": 0, "inserted": 0, "invalid": 0, "duplicates": 0}
+    started = time.perf_counter()
+    rows = iter(rows)
+
+    while True:
+        # Reading and validating run off the event loop; the source may be a file
+        read, valid, errors = await asyncio.to_thread(_next_chunk, rows, chunk_size)
+        if not read:
+            break
+        summary["rows"] += read
+        summary["invalid"] += len(errors)
+        for error in errors:
+            yield error
+
+        if valid:
+            existing = await collection.find(_duplicate_filter([document for _, document in valid]),
+                                             DUPLICATE_FIELDS)
+            taken_emails = {document["email"] for document in existing if document.get("email")}
+            taken_names = {(document.get("firstName"), document.get("lastName")) for document in existing}
+
+            pending = []
+            for number, document in valid:
+                name = (document["firstName"], document["lastName"])
+                if document.get("email") in taken_emails:
+                    error = "Email already registered"
+                elif name in taken_names:
+                    error = "Player with this name already exists"
+                else:
+                    # Later rows in the same chunk are checked against this one too
+                    if document.get("email"):
+                        taken_emails.add(document["email"])
+                    taken_names.add(name)
+                    pending.append((number, document))
+                    continue
+                summary["duplicates"] += 1
+                yield {"row": number, "error": error}
+
+            if pending:
+                # Unique indexes can still reject a row, e.g. a repeated player_id
+                rejected = await collection.insert_many([document for _, document in pending])
+                for index, (number, document) in enumerate(pending):
+                    if index in rejected:
+                        summary["duplicates"] += 1
+                        yield {"row": number, "error": "Player already exists"}
+                    else:
+                        summary["inserted"] += 1
+                        if on_insert:
+                            on_insert(document["_id"], document)
+
+        elapsed = time.perf_counter() - started
+        yield {"progress": dict(summary, seconds=round(elapsed, 2),
+                                rows_per_sec=round(summary["rows"] / elapsed) if elapsed else 0)}
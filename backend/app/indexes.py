@@ -0,0 +1,89 @@
+import logging
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+# Indexes the app relies on. Each entry is (name, keys, options); the names are
+# fixed so drift can be detected by comparing against index_information().
+# email and player_id are only unique where present, since legacy API
+# registrations have no email and web registrations have no player_id.
+PLAYER_INDEXES = [
+    ("email_unique", [("email", ASCENDING)], {
+        "unique": True,
+        "partialFilterExpression": {"email": {"$type": "string"}}
+    }),
+    ("name_lookup", [("firstName", ASCENDING), ("lastName", ASCENDING)], {}),
+    ("player_id_unique", [("player_id", ASCENDING)], {
+        "unique": True,
+        "partialFilterExpression": {"player_id": {"$type": "string"}}
+    }),
+    ("created_at_desc", [("created_at", DESCENDING)], {}),
+]
+
+logger = logging.getLogger(__name__)
+
+MATCH_STATS_INDEXES = [
+    ("week_league", [("week", ASCENDING), ("league", ASCENDING)], {}),
+    ("player_week", [("player_id", ASCENDING), ("week", ASCENDING)], {}),
+    ("player_date", [("player_id", ASCENDING), ("match_date", DESCENDING)], {}),
+]
+
+PLAYER_AGGREGATE_INDEXES = [
+    ("player_season", [("player_id", ASCENDING), ("season", ASCENDING)], {}),
+]
+
+
+def _describe(info):
+    """Reduce index_information() output to the fields we compare"""
+    return {
+        "key": [(field, int(direction) if isinstance(direction, float) else direction)
+                for field, direction in info["key"]],
+        "unique": bool(info.get("unique", False)),
+        "partialFilterExpression": info.get("partialFilterExpression"),
+    }
+
+
+def ensure_indexes(collection, specs):
+    """Create missing indexes and report any that differ from the spec.
+
+    Mismatched indexes are reported but never dropped, so a bad deploy cannot
+    silently remove an index production depends on.
+    """
+    existing = collection.index_information()
+    report = {"created": [], "ok": [], "drift": [], "failed": [], "unmanaged": []}
+
+    missing = []
+    for name, keys, options in specs:
+        if name not in existing:
+            missing.append(IndexModel(keys, name=name, **options))
+            continue
+        actual = _describe(existing[name])
+        expected = {
+            "key": [(field, direction) for field, direction in keys],
+            "unique": options.get("unique", False),
+            "partialFilterExpression": options.get("partialFilterExpression"),
+        }
+        if actual == expected:
+            report["ok"].append(name)
+        else:
+            report["drift"].append({"name": name, "expected": expected, "actual": actual})
+
+    for model in missing:
+        name = model.document["name"]
+        try:
+            collection.create_indexes([model])
+            report["created"].append(name)
+        except OperationFailure as e:
+            report["failed"].append({"name": name, "error": str(e)})
+
+    managed = {name for name, _, _ in specs} | {"_id_"}
+    report["unmanaged"] = sorted(name for name in existing if name not in managed)
+
+    for entry in report["drift"]:
+        logger.warning("Index drift", extra={"collection": collection.name, "index": entry["name"],
+                                             "expected": entry["expected"], "actual": entry["actual"]})
+    for entry in report["failed"]:
+        logger.error("Index creation failed", extra={"collection": collection.name, "index": entry["name"],
+                                                     "error": entry["error"]})
+    if report["created"]:
+        logger.info("Created indexes", extra={"collection": collection.name, "indexes": report["created"]})
+    return report
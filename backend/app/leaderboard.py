@@ -0,0 +1,132 @@
+import heapq
+import threading
+from datetime import date, datetime
+from itertools import islice
+from sortedcontainers import SortedList
+
+# Weekly rankings are kept permanently sorted: each board holds a SortedList of
+# (-score, player_id) keys, so recording a result, looking up a rank and
+# slicing a page are all O(log N) instead of re-sorting every player per
+# request. A board exists per (week, league), plus an "all" league board, and
+# each board keeps one extra SortedList per position category for filtering.
+# A search filter arrives as the set of matching player ids, which are looked
+# up in the board directly rather than scanning the ranking for them.
+ALL_LEAGUES = "all"
+
+
+def week_key(match_date):
+    """ISO week key such as 2025-W07 for a date, datetime or YYYY-MM-DD string"""
+    if isinstance(match_date, str):
+        match_date = date.fromisoformat(match_date[:10])
+    elif isinstance(match_date, datetime):
+        match_date = match_date.date()
+    year, week, _ = match_date.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class _Board:
+    def __init__(self):
+        self.totals = {}
+        self.positions = {}
+        self.ranking = SortedList()
+        self.by_position = {}
+
+    def _key(self, player_id):
+        rating_sum, matches = self.totals[player_id]
+        return (-round(rating_sum / matches, 2), player_id)
+
+    def _discard(self, player_id):
+        if player_id not in self.totals:
+            return
+        key = self._key(player_id)
+        self.ranking.discard(key)
+        position = self.positions.get(player_id)
+        if position in self.by_position:
+            self.by_position[position].discard(key)
+
+    def add(self, player_id, rating, matches, position):
+        self._discard(player_id)
+        rating_sum, count = self.totals.get(player_id, (0.0, 0))
+        rating_sum += rating
+        count += matches
+        if count <= 0:
+            self.totals.pop(player_id, None)
+            self.positions.pop(player_id, None)
+            return
+        self.totals[player_id] = (rating_sum, count)
+        if position:
+            self.positions[player_id] = position
+        key = self._key(player_id)
+        self.ranking.add(key)
+        position = self.positions.get(player_id)
+        if position:
+            self.by_position.setdefault(position, SortedList()).add(key)
+
+
+class Leaderboard:
+    """Incrementally maintained weekly rankings per league"""
+
+    def __init__(self):
+        self._boards = {}
+        self._players = {}
+        self._lock = threading.Lock()
+
+    def set_player(self, player_id, info):
+        """Store display fields (name, position, club, img) for a ranked player"""
+        self._players[str(player_id)] = info
+
+    def player(self, player_id):
+        return self._players.get(str(player_id))
+
+    def record(self, player_id, week, league, rating, position=None, matches=1):
+        """Add a match rating to the player's weekly average.
+
+        A correction is recorded as the old rating with matches=-1 followed by
+        the new rating.
+        """
+        player_id = str(player_id)
+        with self._lock:
+            for board_league in (league, ALL_LEAGUES):
+                board = self._boards.setdefault((week, board_league), _Board())
+                board.add(player_id, rating * (1 if matches > 0 else -1), matches, position)
+
+    def weeks(self, league=ALL_LEAGUES):
+        return sorted(week for week, board_league in self._boards if board_league == league)
+
+    def rank(self, player_id, week, league=ALL_LEAGUES):
+        board = self._boards.get((week, league))
+        player_id = str(player_id)
+        if not board or player_id not in board.totals:
+            return None
+        return board.ranking.index(board._key(player_id)) + 1
+
+    def page(self, week, league=ALL_LEAGUES, position=None, page=1, per_page=20, players=None):
+        """Return (total, rows) for one page of a board, optionally filtered by
+        position and to a set of player ids such as search matches"""
+        board = self._boards.get((week, league))
+        if not board:
+            return 0, []
+        ranking = board.by_position.get(position, SortedList()) if position else board.ranking
+        start = (page - 1) * per_page
+        if players is not None:
+            found = [player_id for player_id in players if player_id in board.totals
+                     and (not position or board.positions.get(player_id) == position)]
+            total, end = len(found), start + per_page
+            if total and end * len(ranking) // total < total:
+                # Matches are dense in the ranking: walk it until the page is full
+                selected = list(islice((key for key in ranking if key[1] in players), start, end))
+            else:
+                selected = heapq.nsmallest(end, map(board._key, found))[start:]
+        else:
+            total, selected = len(ranking), ranking.islice(start, start + per_page)
+        rows = []
+        for key in selected:
+            player_id = key[1]
+            rows.append({
+                "rank": board.ranking.index(key) + 1 if position or players is not None else start + len(rows) + 1,
+                "player_id": player_id,
+                "score": -key[0],
+                "matches": board.totals[player_id][1],
+                **self._players.get(player_id, {}),
+            })
+        return total, rows
@@ -0,0 +1,131 @@
+import time
+import asyncio
+from app.ratings import STAT_FIELDS, rate
+
+# Live match state. A scout streams per-event increments tagged with a
+# sequence number; the server applies each event once, in order, to a
+# per-player aggregate and fans the new stats and rating out to every watcher.
+# Watchers each get a small bounded queue: a slow client drops stale updates
+# rather than holding memory or delaying the others, and every update carries
+# the full aggregate so dropping one loses nothing.
+WATCHER_QUEUE_SIZE = 64
+LIVE_MATCH_IDLE_SECONDS = 6 * 60 * 60
+LIVE_MAX_MATCHES = 500
+EVENT_TYPES = {"stat", "substitution", "end"}
+
+
+class EventError(Exception):
+    pass
+
+
+class LiveMatch:
+    def __init__(self, match_id):
+        self.match_id = match_id
+        self.last_seq = 0
+        self.players = {}
+        self.substitutions = {}
+        self.ended = False
+        self.updated = time.monotonic()
+        self._watchers = set()
+
+    def snapshot(self):
+        return {
+            "type": "snapshot",
+            "match_id": self.match_id,
+            "seq": self.last_seq,
+            "ended": self.ended,
+            "players": {
+                player_id: {"stats": stats, "rating": rate(stats),
+                            "substituted_at": self.substitutions.get(player_id)}
+                for player_id, stats in self.players.items()
+            },
+        }
+
+    def apply(self, event):
+        """Apply one event; returns the update to broadcast, or None for a replayed event.
+
+        Raises EventError for malformed events or for a gap in the sequence,
+        in which case the client should resend from last_seq + 1.
+        """
+        try:
+            seq = int(event["seq"])
+        except (KeyError, TypeError, ValueError):
+            raise EventError("seq is required")
+        if seq <= self.last_seq:
+            return None
+        if seq != self.last_seq + 1:
+            raise EventError(f"expected seq {self.last_seq + 1}")
+
+        event_type = event.get("type", "stat")
+        if event_type not in EVENT_TYPES:
+            raise EventError(f"unknown event type {event_type}")
+        player_id = str(event.get("player_id") or "")
+        if event_type != "end" and not player_id:
+            raise EventError("player_id is required")
+
+        update = {"type": event_type, "match_id": self.match_id, "seq": seq}
+        if event_type == "stat":
+            metric = event.get("metric")
+            if metric not in STAT_FIELDS:
+                raise EventError(f"unknown metric {metric}")
+            try:
+                delta = -1 if float(event.get("delta", 1)) < 0 else 1
+            except (TypeError, ValueError):
+                raise EventError("delta must be a number")
+            stats = self.players.setdefault(player_id, dict.fromkeys(STAT_FIELDS, 0))
+            stats[metric] = max(0, stats[metric] + delta)
+            update.update(player_id=player_id, stats=dict(stats), rating=rate(stats))
+        elif event_type == "substitution":
+            self.substitutions[player_id] = event.get("minute")
+            update.update(player_id=player_id, minute=event.get("minute"))
+        else:
+            self.ended = True
+
+        self.last_seq = seq
+        self.updated = time.monotonic()
+        self._broadcast(update)
+        return update
+
+    def watch(self):
+        queue = asyncio.Queue(maxsize=WATCHER_QUEUE_SIZE)
+        self._watchers.add(queue)
+        return queue
+
+    def unwatch(self, queue):
+        self._watchers.discard(queue)
+
+    @property
+    def watchers(self):
+        return len(self._watchers)
+
+    def _broadcast(self, update):
+        for queue in self._watchers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+
+class LiveMatches:
+    """Registry of in-progress matches"""
+
+    def __init__(self):
+        self._matches = {}
+
+    def get(self, match_id, create=False):
+        """Return a match, creating it if asked; None when unknown, or when
+        LIVE_MAX_MATCHES are already live and none of them has gone idle"""
+        match = self._matches.get(match_id)
+        if match is None and create:
+            if len(self._matches) >= LIVE_MAX_MATCHES:
+                self.expire()
+                if len(self._matches) >= LIVE_MAX_MATCHES:
+                    return None
+            match = self._matches[match_id] = LiveMatch(match_id)
+        return match
+
+    def expire(self):
+        """Forget matches with no events or watchers for LIVE_MATCH_IDLE_SECONDS"""
+        cutoff = time.monotonic() - LIVE_MATCH_IDLE_SECONDS
+        for match_id, match in list(self._matches.items()):
+            if match.updated < cutoff and not match.watchers:
+                del self._matches[match_id]
@@ -1,31 +1,68 @@
 
 import os
-from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException, Response, Cookie
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, Form, File, UploadFile, HTTPException, Response, Cookie, BackgroundTasks, Header, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.requests import Request
 from typing import Optional, List
-from pydantic import BaseModel
+import io
 import json
-import bcrypt
 from pathlib import Path
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from bson.objectid import ObjectId
+from datetime import date, datetime, timedelta
 
-# Load environment variables
+# Load environment variables before the app modules read their settings
 load_dotenv()
 
-app = FastAPI()
+from app.db import MongoCollection, JsonCollection, run_db, shutdown_executor
+from app.storage import JsonlStore
+from app.cache import TTLCache
+from app.leaderboard import Leaderboard, ALL_LEAGUES, week_key
+from app.indexes import PLAYER_INDEXES, MATCH_STATS_INDEXES, PLAYER_AGGREGATE_INDEXES, ensure_indexes
+from app.models import AwardsUpdate, BioUpdate, MatchStatsSubmission, Player
+from app.ratings import rate, rate_matrix, stat_matrix
+from app.batching import BatchWriter, WriteBehindQueue
+from app.search import SEARCH_FIELDS, SearchIndex
+from app.live import LiveMatches, EventError
+from app.aggregates import aggregate_id, changes, season_key, summarize
+from app.similarity import SimilarityIndex
+from app.pages import PageCache
+from app.assets import AssetFiles, asset, build_assets
+from app.responses import FastJSONResponse, dumps
+from app.compression import CompressionMiddleware
+from app.log import configure_logging
+from app.metrics import InstrumentedTemplates, MetricsMiddleware, render_metrics
+from app.photos import (PhotoTooLarge, InvalidPhoto, PHOTO_MAX_BYTES, save_photo, discard_photo, release_photo,
+                        generate_thumbnails, thumbnail_url)
+from app.passwords import PoolSaturated, hash_password, verify_password, shutdown_pool
+from app.export import (MEDIA_TYPES, MATCH_STATS_COLUMNS, PLAYER_COLUMNS, PLAYER_FALLBACKS, PRIVATE_PLAYER_COLUMNS,
+                        export_formats, export_stream, match_stats_filter, player_filter, select_columns)
+from app.importer import import_format, import_players, read_rows
+from app.validation import array_records, ndjson_records, read_results, spool_results
+from app.mongo import MONGO_URI, client_settings, close_client, get_database, ping, pool_stats
+import asyncio
+import time
+import hashlib
+import logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware)
+# Added last so it is outermost and times compression too
+app.add_middleware(MetricsMiddleware)
 
 # Mount static files
+app.mount("/static/dist", AssetFiles(directory="static/dist", check_dir=False), name="assets")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Setup templates
-templates = Jinja2Templates(directory="templates")
+templates = InstrumentedTemplates(directory="templates")
+templates.env.globals["asset"] = asset
+pages = PageCache(templates, "templates")
 
 # Create necessary directories
 uploads_dir = Path("static/uploads")
@@ -36,40 +73,257 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# MongoDB setup with fallback to JSON
-MONGO_URI = os.getenv("MONGO_URI")
+# Session caches: decoded tokens keyed by the token string, and projected
+# player profiles (no password hash) keyed by user id.
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "300"))
+token_cache = TTLCache("tokens", maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+profile_cache = TTLCache("profiles", maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+# MongoDB setup with fallback to JSON. The shared client connects lazily;
+# warm_up_mongo checks the connection at startup.
 if MONGO_URI and SECRET_KEY:
     try:
-        client = MongoClient(MONGO_URI)
-        db = client["enejistats"]
+        db = get_database()
         players_collection = db["players"]
         contact_collection = db["contact_messages"]
-        print("Connected to MongoDB")
+        match_stats_collection = db["match_stats"]
+        player_aggregates_collection = db["player_aggregates"]
+        logger.info("MongoDB client configured", extra=client_settings())
     except Exception as e:
-        print(f"MongoDB connection failed: {e}")
-        client = None
+        logger.error("MongoDB configuration failed", extra={"error": str(e)})
         db = None
         players_collection = None
         contact_collection = None
+        match_stats_collection = None
+        player_aggregates_collection = None
 else:
-    client = None
     db = None
     players_collection = None
     contact_collection = None
-    print("Warning: MONGO_URI or SECRET_KEY not set. Using JSON file storage.")
-
-# Pydantic Models
-class Player(BaseModel):
-    player_id: str
-    first_name: str
-    middle_name: Optional[str] = ""
-    last_name: str
-    dob: str
-    nationality: str
-    preferred_position_category: str
-    preferred_position: str
-    club: str
-    photo_url: str
+    match_stats_collection = None
+    player_aggregates_collection = None
+    logger.warning("MONGO_URI or SECRET_KEY not set, using JSON file storage")
+
+# Async data access: every route goes through these so no handler blocks the
+# event loop on a database call. The JSON file sits behind the same interface.
+json_store = JsonlStore("registrations.jsonl", legacy_path="registrations.json")
+# Every local store opened here, so they are all synced, compacted and flushed at shutdown
+local_stores = [json_store]
+
+def local_store(path):
+    store = JsonlStore(path)
+    local_stores.append(store)
+    return JsonCollection(store)
+
+json_players = JsonCollection(json_store)
+players = MongoCollection(players_collection) if players_collection is not None else json_players
+contacts = (MongoCollection(contact_collection) if contact_collection is not None
+            else local_store("contact_messages.jsonl"))
+contact_queue = WriteBehindQueue("contacts", contacts, "contact_messages.journal")
+match_stats = (MongoCollection(match_stats_collection, object_ids=False) if match_stats_collection is not None
+               else local_store("match_stats.jsonl"))
+match_writer = BatchWriter(match_stats)
+aggregates = (MongoCollection(player_aggregates_collection, object_ids=False)
+              if player_aggregates_collection is not None
+              else local_store("player_aggregates.jsonl"))
+# A new match is stored with aggregated=False and flipped to True once it is
+# counted in the rankings and season aggregates; until then it counts in
+# neither, and a retried submission finishes it. Older matches have no flag.
+AGGREGATE_MATCH_FIELDS = ["player_id", "match_date", "week", "league", "stats",
+                          "performance_rating", "match_duration", "extra_time", "aggregated"]
+MATCH_HISTORY_LIMIT = 10
+
+rankings = Leaderboard()
+search_index = SearchIndex()
+SEARCH_RESULT_LIMIT = 10
+SEARCH_MAX_RESULT_LIMIT = 50
+live_matches = LiveMatches()
+similarity = SimilarityIndex()
+SIMILAR_PLAYERS_LIMIT = 10
+SIMILAR_PLAYERS_MAX_LIMIT = 50
+LIVE_KEEPALIVE_SECONDS = 15
+
+STORAGE_MAINTENANCE_INTERVAL = 30
+
+async def storage_maintenance():
+    """Periodically flush batched fsyncs, compact the local logs and drop idle live matches"""
+    while True:
+        await asyncio.sleep(STORAGE_MAINTENANCE_INTERVAL)
+        try:
+            for store in local_stores:
+                await run_db(store.sync)
+                await run_db(store.maybe_compact)
+            live_matches.expire()
+        except Exception:
+            logger.exception("Storage maintenance error")
+
+@app.on_event("startup")
+async def warm_up_mongo():
+    """Connect to MongoDB before serving so a bad URI or unreachable cluster is reported at boot"""
+    if players.source != "mongodb":
+        return
+    try:
+        latency = await run_db(ping)
+        logger.info("Connected to MongoDB", extra={"ping_ms": latency})
+    except Exception as e:
+        logger.error("MongoDB warm-up failed", extra={"error": str(e)})
+
+@app.on_event("startup")
+async def start_write_queues():
+    contact_queue.start()
+
+@app.on_event("startup")
+async def build_static_assets():
+    """Fingerprint and precompress static assets before the first page is rendered"""
+    try:
+        built = await asyncio.to_thread(build_assets, "static", "static/dist")
+        logger.info("Built static assets", extra={"count": len(built)})
+    except Exception:
+        logger.exception("Static asset build error")
+
+@app.on_event("startup")
+async def start_storage_maintenance():
+    app.state.storage_task = asyncio.create_task(storage_maintenance())
+
+@app.on_event("startup")
+async def load_leaderboard():
+    """Build the weekly rankings once from stored match stats"""
+    positions = {}
+    cursor = None
+    try:
+        while True:
+            results, cursor = await match_stats.find_page(
+                cursor, 1000, ["player_id", "week", "league", "performance_rating", "aggregated"]
+            )
+            for result in results:
+                if result.get("aggregated") is False:
+                    continue
+                player_id = str(result["player_id"])
+                if player_id not in positions:
+                    summary = await refresh_leaderboard_player(player_id)
+                    positions[player_id] = summary["position_category"] if summary else None
+                rankings.record(player_id, result["week"], result["league"],
+                                   result["performance_rating"], positions[player_id])
+            if not cursor:
+                break
+    except Exception:
+        logger.exception("Leaderboard load error")
+
+@app.on_event("startup")
+async def backfill_aggregates():
+    """Build season aggregates from stored match stats the first time they run"""
+    try:
+        if await aggregates.find_one({}, {"_id": 1}):
+            return
+        cursor = None
+        while True:
+            results, cursor = await match_stats.find_page(cursor, 1000, AGGREGATE_MATCH_FIELDS)
+            await aggregates.increment_many([update for result in results if result.get("aggregated") is not False
+                                             for update in changes(new=result)])
+            if not cursor:
+                break
+    except Exception:
+        logger.exception("Aggregate backfill error")
+
+@app.on_event("startup")
+async def build_similarity_index():
+    """Load every player's latest all-leagues season aggregate into the comparison matrix"""
+    cursor = None
+    try:
+        while True:
+            documents, cursor = await aggregates.find_page(cursor, 1000)
+            refresh_similarity(documents)
+            if not cursor:
+                break
+        logger.info("Similarity index built", extra={"players": len(similarity)})
+    except Exception:
+        logger.exception("Similarity index build error")
+
+@app.on_event("startup")
+async def build_search_index():
+    """Index every player for /api/players/search"""
+    cursor = None
+    try:
+        while True:
+            batch, cursor = await players.find_page(cursor, 1000, PUBLIC_PLAYER_FIELDS)
+            for player in batch:
+                index_player(player["_id"], player)
+            if not cursor:
+                break
+        logger.info("Search index built", extra={"players": len(search_index)})
+    except Exception:
+        logger.exception("Search index build error")
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    """Create and verify the indexes the player lookups depend on"""
+    if players.source != "mongodb":
+        return
+    try:
+        app.state.index_report = await run_db(ensure_indexes, players_collection, PLAYER_INDEXES)
+        await run_db(ensure_indexes, match_stats_collection, MATCH_STATS_INDEXES)
+        await run_db(ensure_indexes, player_aggregates_collection, PLAYER_AGGREGATE_INDEXES)
+    except Exception:
+        logger.exception("Index bootstrap error")
+
+@app.on_event("shutdown")
+async def drain_write_queues():
+    """Write out, or journal, fire-and-forget documents before the db pool stops"""
+    await contact_queue.close()
+
+@app.on_event("shutdown")
+def close_db_executor():
+    app.state.storage_task.cancel()
+    for store in local_stores:
+        store.sync()
+    shutdown_executor()
+    shutdown_pool()
+    close_client()
+
+@app.exception_handler(PoolSaturated)
+async def password_pool_saturated(request: Request, exc: PoolSaturated):
+    return FastJSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
+# Fields that may be exposed by listing endpoints. Credentials and contact
+# details (password, email) are never projected out of the database.
+PUBLIC_PLAYER_FIELDS = [
+    "player_id", "userType", "firstName", "middleName", "lastName", "dob", "gender",
+    "nationality", "photo", "preferredPositionCategory", "preferredPosition",
+    "otherPositions", "dominantFoot", "height", "weight", "league", "club", "created_at"
+]
+REGISTRATIONS_PAGE_SIZE = 50
+REGISTRATIONS_MAX_PAGE_SIZE = 200
+
+LEADERBOARD_PAGE_SIZE = 20
+LEADERBOARD_MAX_PAGE_SIZE = 100
+
+def player_summary(player: dict):
+    """Display fields used by list views such as the leaderboard"""
+    return {
+        "name": f"{player.get('firstName', '')} {player.get('lastName', '')}".strip(),
+        "position": player.get("preferredPosition"),
+        "position_category": player.get("preferredPositionCategory"),
+        "club": player.get("club"),
+        "league": player.get("league"),
+        "img": thumbnail_url(player.get("photo"), "sm"),
+    }
+
+def index_player(player_id, player: dict):
+    """Add or refresh a player in the in-process search and comparison indexes"""
+    search_index.add(player_id, player, player_summary(player))
+    similarity.set_player(player_id, player.get("preferredPositionCategory"), player.get("league"), player.get("dob"))
+
+def public_fields(fields: Optional[str] = None):
+    """Resolve a comma separated field list against PUBLIC_PLAYER_FIELDS"""
+    if not fields:
+        return PUBLIC_PLAYER_FIELDS
+    requested = [field.strip() for field in fields.split(",")]
+    return [field for field in requested if field in PUBLIC_PLAYER_FIELDS] or PUBLIC_PLAYER_FIELDS
 
 # JWT Helper Functions
 def create_access_token(data: dict, expires_delta: timedelta = None):
@@ -79,100 +333,199 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str):
+    if not token:
+        return None
+    user_id = token_cache.get(token)
+    if user_id:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    user_id = payload.get("sub")
+    if user_id:
+        # Never cache a token past its own expiry
+        token_cache.set(token, user_id, ttl=payload["exp"] - time.time())
+    return user_id
+
+async def get_player_profile(user_id: str):
+    """Return the player's profile without credentials, served from cache when possible"""
+    profile = profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+    user_key = players.to_id(user_id)
+    if user_key is None:
+        return None
+    profile = await players.find_one({"_id": user_key}, {"password": 0})
+    if profile:
+        profile_cache.set(user_id, profile)
+    return profile
+
+# Account types trusted to report and correct match statistics
+SCOUT_USER_TYPES = {"scout", "admin"}
+# Account types that may bulk-import player rosters
+IMPORT_USER_TYPES = {"club", "scout", "admin"}
+# Account types that may bulk-export players and match stats
+EXPORT_USER_TYPES = {"analyst", "admin"}
+
+async def require_user_type(access_token, allowed):
+    """Return the logged-in user's profile, raising 401 if not logged in and
+    403 unless their userType is in allowed. Admins are marked by setting
+    userType to "admin" in the database; registration never grants it."""
+    user_id = verify_token(access_token)
+    user = await get_player_profile(user_id) if user_id else None
+    if not user:
+        raise HTTPException(status_code=401, detail="Not logged in")
+    if user.get("userType") not in allowed:
+        raise HTTPException(status_code=403, detail="Not allowed for this account")
+    return user
+
+def invalidate_player(user_id):
+    """Drop cached data derived from a player document after it changes"""
+    profile_cache.pop(str(user_id))
+
+# Fields copied into the search index, comparison matrix or leaderboard rows;
+# edits to any other field only need the cached profile dropped.
+INDEXED_PLAYER_FIELDS = set(SEARCH_FIELDS) | {"photo", "league", "dob"}
+
+async def player_changed(user_id, fields):
+    """Invalidate exactly what is derived from the changed fields of one player"""
+    invalidate_player(user_id)
+    if not INDEXED_PLAYER_FIELDS.intersection(fields):
+        return
+    player = await get_player_profile(str(user_id))
+    if player:
+        index_player(str(user_id), player)
+        if rankings.player(str(user_id)):
+            rankings.set_player(str(user_id), player_summary(player))
 
 # Helper function to save to JSON (fallback when MongoDB is not available)
-def save_to_json(data):
-    registrations_file = Path("registrations.json")
-    if registrations_file.exists():
-        with open(registrations_file, "r") as f:
-            registrations = json.load(f)
-    else:
-        registrations = []
-    
-    registrations.append(data)
-    
-    with open(registrations_file, "w") as f:
-        json.dump(registrations, f, indent=2)
+async def save_to_json(data):
+    return await json_players.insert_one(data)
+
+async def photo_in_use(filename):
+    """Whether a stored player, in MongoDB or the JSON fallback, uses a photo"""
+    for collection in {players, json_players}:
+        if await collection.find_one({"photo": filename}, {"_id": 1}):
+            return True
+    return False
 
 # Routes
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Expose Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+@app.get("/readyz", include_in_schema=False)
+async def readiness():
+    """Report whether storage is reachable, with MongoDB pool statistics"""
+    write_queues = {"contacts": contact_queue.stats()}
+    if players.source != "mongodb":
+        return {"status": "ready", "storage": players.source, "write_queues": write_queues}
+    report = {"storage": "mongodb", "pool": pool_stats.snapshot(), "max_pool_size": client_settings()["maxPoolSize"],
+              "write_queues": write_queues}
+    try:
+        report["ping_ms"] = await run_db(ping)
+    except Exception as e:
+        report.update(status="unavailable", error=str(e))
+        return FastJSONResponse(status_code=503, content=report)
+    report["status"] = "ready"
+    return report
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Serve the home page"""
     try:
-        return templates.TemplateResponse("index.html", {"request": request})
+        return pages.serve(request, "index.html")
     except Exception:
         try:
-            return templates.TemplateResponse("register.html", {"request": request})
+            return pages.serve(request, "register.html")
         except Exception:
             raise HTTPException(status_code=404, detail="Home page not found")
 
 @app.get("/about", response_class=HTMLResponse)
 async def about(request: Request):
     """Serve the about page"""
-    return templates.TemplateResponse("about.html", {"request": request})
+    return pages.serve(request, "about.html")
 
 @app.get("/contact", response_class=HTMLResponse)
 async def contact(request: Request):
     """Serve the contact page"""
-    return templates.TemplateResponse("contact.html", {"request": request})
+    return pages.serve(request, "contact.html")
 
 @app.get("/leaderboard", response_class=HTMLResponse)
 async def leaderboard(request: Request):
     """Serve the leaderboard page"""
-    return templates.TemplateResponse("leaderboard.html", {"request": request})
+    return pages.serve(request, "leaderboard.html")
 
 @app.get("/browse", response_class=HTMLResponse)
 async def browse(request: Request):
     """Serve the browse page"""
-    return templates.TemplateResponse("browse.html", {"request": request})
+    return pages.serve(request, "browse.html")
 
 @app.get("/stats-area", response_class=HTMLResponse)
 async def stats_area(request: Request):
     """Serve the stats area page with tabbed access to Player and Browse."""
-    return templates.TemplateResponse("stats-area.html", {"request": request})
+    return pages.serve(request, "stats-area.html")
 
 @app.get("/stats", response_class=HTMLResponse)
 async def stats(request: Request):
     """Serve the stats page"""
-    return templates.TemplateResponse("stats_area.html", {"request": request})
+    return pages.serve(request, "stats_area.html")
 
 @app.get("/player", response_class=HTMLResponse)
 async def player(request: Request):
     """Serve the player page"""
-    return templates.TemplateResponse("player.html", {"request": request})
+    return pages.serve(request, "player.html")
 
 @app.get("/stats/browse", response_class=HTMLResponse)
 async def stats_browse(request: Request):
     """Serve the stats browse page"""
-    return templates.TemplateResponse("browse.html", {"request": request})
+    return pages.serve(request, "browse.html")
 
 @app.get("/stats/player", response_class=HTMLResponse)
 async def stats_player(request: Request):
     """Serve the stats player page"""
-    return templates.TemplateResponse("player.html", {"request": request})
+    return pages.serve(request, "player.html")
 
 @app.get("/register", response_class=HTMLResponse)
 async def get_register_form(request: Request):
     """Serve the registration form"""
-    return templates.TemplateResponse("register.html", {"request": request})
+    return pages.serve(request, "register.html")
 
 @app.get("/login", response_class=HTMLResponse)
 async def get_login(request: Request, access_token: str = Cookie(None)):
-    """Serve the login page"""
+    """Serve the login page, or redirect a logged-in visitor to their dashboard"""
     if access_token and verify_token(access_token):
         return RedirectResponse(url="/dashboard", status_code=302)
-    return templates.TemplateResponse("login.html", {"request": request})
+    # The answer depends on the visitor's session, so it is neither prerendered nor
+    # reused by the browser without asking again
+    return templates.TemplateResponse("login.html", {"request": request},
+                                      headers={"Cache-Control": "private, no-cache"})
 
 @app.get("/player-dashboard", response_class=HTMLResponse)
-async def player_dashboard(request: Request):
+async def player_dashboard(request: Request, access_token: str = Cookie(None)):
     """Serve the player dashboard page with session check"""
-    return templates.TemplateResponse("player-dashboard.html", {"request": request})
+    user_id = verify_token(access_token)
+    if not user_id:
+        return RedirectResponse(url="/login")
+
+    user = await get_player_profile(user_id)
+    if not user:
+        return RedirectResponse(url="/login")
+
+    season, history = await asyncio.gather(
+        aggregates.find_one({"_id": aggregate_id(user_id, season_key(date.today()))}),
+        match_stats.find({"player_id": user_id}, limit=MATCH_HISTORY_LIMIT, sort=[("match_date", -1)])
+    )
+    return templates.TemplateResponse("player-dashboard.html", {
+        "request": request,
+        "player": user,
+        "player_stats": history,
+        "season": summarize(season)
+    })
 
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request, access_token: str = Cookie(None)):
@@ -181,10 +534,7 @@ async def dashboard(request: Request, access_token: str = Cookie(None)):
     if not user_id:
         return RedirectResponse(url="/login")
 
-    if not players_collection:
-        return RedirectResponse(url="/login")
-
-    user = players_collection.find_one({"_id": ObjectId(user_id)})
+    user = await get_player_profile(user_id)
     if not user:
         return RedirectResponse(url="/login")
 
@@ -194,16 +544,87 @@ async def dashboard(request: Request, access_token: str = Cookie(None)):
     })
 
 @app.get("/logout")
-async def logout():
+async def logout(access_token: str = Cookie(None)):
     """Handle user logout"""
+    if access_token:
+        user_id = verify_token(access_token)
+        token_cache.pop(access_token)
+        if user_id:
+            invalidate_player(user_id)
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie("access_token")
     return response
 
-@app.get("/success", response_class=HTMLResponse)
-async def registration_success():
-    """Show registration success page"""
-    return HTMLResponse(content="""
+PROFILE_FIELDS = {"bio": 1, "awards": 1, "version": 1}
+
+def version_filter(user_key, version):
+    """Match the player only while it is still at version; documents saved before
+    versioning count as version 0"""
+    if version is None:
+        return {"_id": user_key}
+    if version == 0:
+        return {"_id": user_key, "$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"_id": user_key, "version": version}
+
+async def update_profile(access_token, player_id, version, changes):
+    """Apply a partial profile edit for the logged-in player with an optimistic version check.
+
+    changes(current) returns the Mongo update for the fields that actually differ
+    from the stored document (or an empty dict). A stale version gets a 409 with
+    the current one; omitting version skips the check."""
+    user_id = verify_token(access_token)
+    if not user_id:
+        return FastJSONResponse(content={"success": False, "message": "Not logged in"}, status_code=401)
+    if player_id and str(player_id) != str(user_id):
+        return FastJSONResponse(content={"success": False, "message": "You can only edit your own profile"},
+                                status_code=403)
+    user_key = players.to_id(user_id)
+    current = await players.find_one({"_id": user_key}, PROFILE_FIELDS) if user_key else None
+    if not current:
+        return FastJSONResponse(content={"success": False, "message": "Unknown player"}, status_code=404)
+
+    current_version = current.get("version", 0)
+    if version is not None and version != current_version:
+        return FastJSONResponse(content={"success": False, "version": current_version,
+                                         "message": "Your profile was changed elsewhere; reload and try again"},
+                                status_code=409)
+    update = changes(current)
+    if not update:
+        return {"success": True, "version": current_version, "changed": []}
+
+    changed = sorted({field for operator in update.values() for field in operator})
+    update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+    update["$inc"] = {"version": 1}
+    # The read above is only a hint: the version in the filter makes the write
+    # itself conditional, so a concurrent edit in between still gets a 409.
+    if not await players.update_one(version_filter(user_key, current_version), update):
+        latest = await players.find_one({"_id": user_key}, {"version": 1})
+        return FastJSONResponse(content={"success": False, "version": (latest or {}).get("version", 0),
+                                         "message": "Your profile was changed elsewhere; reload and try again"},
+                                status_code=409)
+    await player_changed(user_id, changed)
+    return {"success": True, "version": current_version + 1, "changed": changed}
+
+@app.post("/api/update-player-bio")
+async def update_player_bio(edit: BioUpdate, access_token: str = Cookie(None)):
+    """Set the logged-in player's bio"""
+    bio = edit.bio.strip()
+    return await update_profile(access_token, edit.player_id, edit.version,
+                                lambda current: {} if current.get("bio", "") == bio else {"$set": {"bio": bio}})
+
+@app.post("/api/update-player-awards")
+async def update_player_awards(edit: AwardsUpdate, access_token: str = Cookie(None)):
+    """Replace the logged-in player's awards, appending when the list only grew"""
+    def changes(current):
+        existing = current.get("awards") or []
+        if edit.awards == existing:
+            return {}
+        if existing and edit.awards[:len(existing)] == existing:
+            return {"$push": {"awards": {"$each": edit.awards[len(existing):]}}}
+        return {"$set": {"awards": edit.awards}}
+    return await update_profile(access_token, edit.player_id, edit.version, changes)
+
+REGISTRATION_SUCCESS_HTML = """
     <!DOCTYPE html>
     <html lang="en">
     <head>
@@ -242,25 +663,462 @@ async def registration_success():
         </footer>
     </body>
     </html>
-    """)
+    """
+
+@app.get("/success", response_class=HTMLResponse)
+async def registration_success(request: Request):
+    """Show registration success page"""
+    return pages.serve_html(request, "success", REGISTRATION_SUCCESS_HTML)
 
 @app.get("/registrations")
-async def get_registrations():
-    """Get all registrations (for testing purposes)"""
-    if players_collection:
+async def get_registrations(
+    limit: int = REGISTRATIONS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    """Get registrations one page at a time, or stream them all as NDJSON with format=ndjson"""
+    limit = max(1, min(limit, REGISTRATIONS_MAX_PAGE_SIZE))
+    selected = public_fields(fields)
+
+    if format == "ndjson":
+        # Fetch the first page up front so a bad cursor is a 400, not a broken stream
         try:
-            registrations = list(players_collection.find({}, {"_id": 0}))
-            return {"registrations": registrations, "source": "mongodb"}
-        except Exception as e:
-            print(f"MongoDB query error: {e}")
-    
-    registrations_file = Path("registrations.json")
-    if registrations_file.exists():
-        with open(registrations_file, "r") as f:
-            registrations = json.load(f)
-        return {"registrations": registrations, "source": "json"}
+            first_page = await players.find_page(cursor, limit, selected)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return StreamingResponse(
+            stream_registrations(players, first_page, limit, selected),
+            media_type="application/x-ndjson"
+        )
+
+    # A cursor belongs to the store that issued it, so only the first page falls back
+    sources = [players] if players is json_players or cursor else [players, json_players]
+    for source in sources:
+        try:
+            registrations, next_cursor = await source.find_page(cursor, limit, selected)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        except Exception:
+            logger.exception("MongoDB query error")
+            continue
+        for registration in registrations:
+            registration.pop("_id", None)
+        return FastJSONResponse({"registrations": registrations, "next_cursor": next_cursor, "source": source.source})
     
-    return {"registrations": [], "source": "none"}
+    return FastJSONResponse({"registrations": [], "next_cursor": None, "source": "none"})
+
+async def stream_registrations(source, first_page, batch_size, fields):
+    """Yield one JSON line per registration, fetching a page at a time after first_page"""
+    registrations, cursor = first_page
+    while True:
+        lines = []
+        for registration in registrations:
+            registration.pop("_id", None)
+            lines.append(dumps(registration) + b"\n")
+        if lines:
+            yield b"".join(lines)
+        if not cursor:
+            break
+        registrations, cursor = await source.find_page(cursor, batch_size, fields)
+
+def export_response(name, source, filter, columns, types, format, fallbacks=None):
+    """Stream an export as an attachment"""
+    return StreamingResponse(
+        export_stream(source, filter, columns, types, format, fallbacks=fallbacks),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
+
+def export_columns(columns, fields, format, private=()):
+    if format not in export_formats():
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(export_formats())}")
+    try:
+        return select_columns(columns, fields, private)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/export/players")
+async def export_players(
+    format: str = "csv",
+    fields: Optional[str] = None,
+    league: Optional[str] = None,
+    created_from: Optional[date] = None,
+    created_to: Optional[date] = None,
+    access_token: str = Cookie(None)
+):
+    """Stream players as CSV or Parquet; email only when named in fields, never passwords.
+    Analysts and admins only."""
+    await require_user_type(access_token, EXPORT_USER_TYPES)
+    columns = export_columns(PLAYER_COLUMNS, fields, format, PRIVATE_PLAYER_COLUMNS)
+    filter = player_filter(players.source, league, created_from, created_to)
+    return export_response("players", players, filter, columns, PLAYER_COLUMNS, format, PLAYER_FALLBACKS)
+
+@app.get("/api/export/match-stats")
+async def export_match_stats(
+    format: str = "csv",
+    fields: Optional[str] = None,
+    league: Optional[str] = None,
+    player_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    access_token: str = Cookie(None)
+):
+    """Stream match stats as CSV or Parquet, one stat per column. Analysts and admins only."""
+    await require_user_type(access_token, EXPORT_USER_TYPES)
+    columns = export_columns(MATCH_STATS_COLUMNS, fields, format)
+    filter = match_stats_filter(league, date_from, date_to, player_id)
+    return export_response("match-stats", match_stats, filter, columns, MATCH_STATS_COLUMNS, format)
+
+async def refresh_leaderboard_player(player_id: str):
+    """Load a ranked player's display fields into the leaderboard"""
+    player_key = players.to_id(player_id)
+    player = await players.find_one({"_id": player_key}, {"password": 0}) if player_key else None
+    if not player:
+        return None
+    summary = player_summary(player)
+    rankings.set_player(player_id, summary)
+    return summary
+
+async def ranked_player(player_id: str):
+    """Leaderboard display fields for a player, loading them on first use"""
+    return rankings.player(player_id) or await refresh_leaderboard_player(player_id)
+
+def refresh_similarity(documents):
+    """Feed all-leagues aggregate documents into the comparison matrix"""
+    for document in documents:
+        if document.get("league") == ALL_LEAGUES:
+            similarity.update(document["player_id"], document["season"],
+                              summarize(document)["per_90"], document.get("minutes", 0))
+
+async def update_aggregates(updates):
+    """Apply season aggregate increments; the match itself is already stored.
+    Returns whether the increments were written."""
+    try:
+        await aggregates.increment_many(updates)
+    except Exception:
+        logger.exception("Aggregate update error")
+        return False
+    try:
+        changed = [_id for _id, _, defaults in updates if defaults["league"] == ALL_LEAGUES]
+        refresh_similarity(await aggregates.find({"_id": {"$in": changed}}))
+    except Exception:
+        logger.exception("Similarity refresh error")
+    return True
+
+async def aggregate_match(document, position):
+    """Count a stored match in the rankings and season aggregates, once.
+
+    The match is claimed by flipping its aggregated flag, so a retry racing the
+    original submission cannot count it twice; the claim is released if the
+    aggregates cannot be written.
+    """
+    claimed = await match_stats.update_one({"_id": document["_id"], "aggregated": False},
+                                           {"$set": {"aggregated": True}})
+    if not claimed:
+        return
+    if not await update_aggregates(changes(new=document)):
+        await match_stats.update_one({"_id": document["_id"]}, {"$set": {"aggregated": False}})
+        return
+    rankings.record(document["player_id"], document["week"], document["league"],
+                    document["performance_rating"], position)
+
+def match_id(submission: MatchStatsSubmission, idempotency_key: Optional[str]):
+    """Stable id for a stat line so retried submissions are recognised.
+
+    Defaults to one line per player per fixture when the client sends no key.
+    """
+    key = idempotency_key or submission.idempotency_key
+    if not key:
+        key = "|".join([str(submission.player_id), submission.match_date.isoformat(),
+                        submission.home_team, submission.away_team])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+@app.post("/api/submit-match-stats")
+async def submit_match_stats(
+    submission: MatchStatsSubmission,
+    idempotency_key: Optional[str] = Header(None),
+    access_token: str = Cookie(None)
+):
+    """Store one player's stat line for a match and rate it server-side. Scouts and admins only."""
+    await require_user_type(access_token, SCOUT_USER_TYPES)
+    player_id = str(submission.player_id)
+    summary = await ranked_player(player_id)
+    if not summary:
+        return FastJSONResponse(content={"success": False, "message": "Unknown player"}, status_code=404)
+
+    stats = submission.stats.model_dump()
+    rating = rate(stats)
+    week = week_key(submission.match_date)
+    document = {
+        "_id": match_id(submission, idempotency_key),
+        "player_id": player_id,
+        "home_team": submission.home_team,
+        "away_team": submission.away_team,
+        "match_date": submission.match_date.isoformat(),
+        "week": week,
+        "league": submission.league,
+        "stats": stats,
+        "performance_rating": rating,
+        "match_duration": submission.match_duration,
+        "extra_time": submission.extra_time,
+        "aggregated": False,
+        "created_at": datetime.utcnow()
+    }
+
+    try:
+        duplicate = await match_writer.submit(document)
+    except Exception:
+        logger.exception("Match stats save error")
+        return FastJSONResponse(content={"success": False, "message": "Could not save match stats"}, status_code=500)
+
+    if duplicate:
+        # The stored line wins; finish counting it if the first attempt did not
+        existing = await match_stats.find_one({"_id": document["_id"]},
+                                              {field: 1 for field in AGGREGATE_MATCH_FIELDS})
+        if existing:
+            rating = existing["performance_rating"]
+            if existing.get("aggregated") is False:
+                await aggregate_match(existing, summary["position_category"])
+    else:
+        await aggregate_match(document, summary["position_category"])
+
+    return {
+        "success": True,
+        "duplicate": duplicate,
+        "match_id": document["_id"],
+        "performance_rating": rating
+    }
+
+corrections_lock = asyncio.Lock()
+
+@app.put("/api/match-stats/{stat_id}")
+async def correct_match_stats(stat_id: str, submission: MatchStatsSubmission, access_token: str = Cookie(None)):
+    """Replace a stored stat line, re-rating it and adjusting rankings and season aggregates.
+    Scouts and admins only."""
+    await require_user_type(access_token, SCOUT_USER_TYPES)
+    async with corrections_lock:
+        existing = await match_stats.find_one({"_id": stat_id})
+        if not existing:
+            return FastJSONResponse(content={"success": False, "message": "Unknown match"}, status_code=404)
+        if str(submission.player_id) != existing["player_id"]:
+            return FastJSONResponse(content={"success": False, "message": "player_id cannot be changed"}, status_code=400)
+
+        stats = submission.stats.model_dump()
+        fields = {
+            "home_team": submission.home_team,
+            "away_team": submission.away_team,
+            "match_date": submission.match_date.isoformat(),
+            "week": week_key(submission.match_date),
+            "league": submission.league,
+            "stats": stats,
+            "performance_rating": rate(stats),
+            "match_duration": submission.match_duration,
+            "extra_time": submission.extra_time,
+            "updated_at": datetime.utcnow()
+        }
+        await match_stats.set_many([(stat_id, fields)])
+        corrected = dict(existing, **fields)
+
+        summary = await ranked_player(existing["player_id"])
+        position = summary["position_category"] if summary else None
+        if existing.get("aggregated") is False:
+            # Never counted, so count the corrected line instead
+            await aggregate_match(corrected, position)
+        else:
+            rankings.record(existing["player_id"], existing["week"], existing["league"],
+                            existing["performance_rating"], position, matches=-1)
+            rankings.record(corrected["player_id"], corrected["week"], corrected["league"],
+                            corrected["performance_rating"], position)
+            await update_aggregates(changes(existing, corrected))
+
+    return {"success": True, "match_id": stat_id, "performance_rating": corrected["performance_rating"]}
+
+@app.get("/api/players/{player_id}/season")
+async def player_season(player_id: str, season: Optional[str] = None, league: str = ALL_LEAGUES):
+    """Precomputed season totals, averages and per-90 rates for one player"""
+    season = season or season_key(date.today())
+    document = await aggregates.find_one({"_id": aggregate_id(player_id, season, league)})
+    if not document:
+        raise HTTPException(status_code=404, detail="No matches recorded for this season")
+    return summarize(document)
+
+@app.websocket("/ws/matches/{live_match_id}")
+async def scout_match_feed(websocket: WebSocket, live_match_id: str):
+    """Scout event channel: receives sequenced increments, replies with acks. Scouts and admins only."""
+    user_id = verify_token(websocket.cookies.get("access_token"))
+    user = await get_player_profile(user_id) if user_id else None
+    if not user or user.get("userType") not in SCOUT_USER_TYPES:
+        # Closing before accept rejects the handshake
+        await websocket.close(code=1008)
+        return
+    match = live_matches.get(live_match_id, create=True)
+    if match is None:
+        await websocket.close(code=1013, reason="Too many live matches")
+        return
+    await websocket.accept()
+    # The snapshot lets a reconnecting scout restore state and resend from seq + 1
+    await websocket.send_json(match.snapshot())
+    try:
+        while True:
+            try:
+                event = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_json({"type": "error", "message": "Events must be JSON objects",
+                                           "expected": match.last_seq + 1})
+                continue
+            try:
+                if not isinstance(event, dict):
+                    raise EventError("Events must be JSON objects")
+                match.apply(event)
+                await websocket.send_json({"type": "ack", "seq": match.last_seq})
+            except EventError as e:
+                await websocket.send_json({"type": "error", "message": str(e), "expected": match.last_seq + 1})
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/api/matches/{live_match_id}/live")
+async def watch_match(live_match_id: str, request: Request):
+    """Server-sent events with live stats and ratings for a match"""
+    match = live_matches.get(live_match_id)
+    if match is None:
+        raise HTTPException(status_code=404, detail="Match is not live")
+
+    async def events():
+        queue = match.watch()
+        try:
+            yield f"data: {json.dumps(match.snapshot())}\n\n"
+            while not match.ended and not await request.is_disconnected():
+                try:
+                    update = await asyncio.wait_for(queue.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {update['seq']}\ndata: {json.dumps(update)}\n\n"
+                if update["type"] == "end":
+                    break
+        finally:
+            match.unwatch(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+RESCORE_BATCH_SIZE = 1000
+
+@app.post("/api/rescore-matches")
+async def rescore_matches(week: Optional[str] = None, league: Optional[str] = None,
+                          access_token: str = Cookie(None)):
+    """Recompute stored ratings with the current weights, e.g. for one matchday. Admins only."""
+    await require_user_type(access_token, {"admin"})
+    filter = {}
+    if week:
+        filter["week"] = week
+    if league:
+        filter["league"] = league
+
+    matched = rescored = 0
+    # Corrections adjust the same rankings and aggregates, so they wait for the rescore
+    async with corrections_lock:
+        async for results in match_stats.batches(filter, {field: 1 for field in AGGREGATE_MATCH_FIELDS},
+                                                 RESCORE_BATCH_SIZE):
+            matched += len(results)
+            ratings = rate_matrix(stat_matrix([result["stats"] for result in results])).tolist()
+            changed = [(result, rating) for result, rating in zip(results, ratings)
+                       if rating != result["performance_rating"]]
+            if not changed:
+                continue
+            await match_stats.set_many([(result["_id"], {"performance_rating": rating})
+                                        for result, rating in changed])
+
+            updates = []
+            for result, rating in changed:
+                if result.get("aggregated") is False:
+                    # Counted with its stored rating once its submission is retried
+                    continue
+                summary = await ranked_player(result["player_id"])
+                position = summary["position_category"] if summary else None
+                rankings.record(result["player_id"], result["week"], result["league"],
+                                result["performance_rating"], position, matches=-1)
+                rankings.record(result["player_id"], result["week"], result["league"], rating, position)
+                updates.extend(changes(result, dict(result, performance_rating=rating)))
+            await update_aggregates(updates)
+            rescored += len(changed)
+
+    return {"matches": matched, "rescored": rescored}
+
+@app.get("/api/players/{player_id}/similar")
+async def similar_players(
+    player_id: str,
+    k: int = SIMILAR_PLAYERS_LIMIT,
+    position: Optional[str] = None,
+    league: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None
+):
+    """Players with the closest per-90 profile, optionally within a position, league or age band"""
+    k = max(1, min(k, SIMILAR_PLAYERS_MAX_LIMIT))
+    nearest = similarity.similar(player_id, k, position_category=position, league=league,
+                                 min_age=min_age, max_age=max_age)
+    if nearest is None:
+        raise HTTPException(status_code=404, detail="No match statistics for this player")
+    results = []
+    for other_id, distance, season in nearest:
+        results.append({"player_id": other_id, "distance": distance, "season": season,
+                        **(await ranked_player(other_id) or {})})
+    return {"player_id": player_id, "results": results}
+
+@app.get("/api/players/{player_id}/percentiles")
+async def player_percentiles(
+    player_id: str,
+    position: Optional[str] = None,
+    league: Optional[str] = None,
+    min_age: Optional[int] = None,
+    max_age: Optional[int] = None
+):
+    """Per-metric percentile ranks against peers; defaults to the player's position category"""
+    if position is None:
+        summary = await ranked_player(player_id)
+        position = summary["position_category"] if summary else None
+    ranks = similarity.percentiles(player_id, position_category=position, league=league,
+                                   min_age=min_age, max_age=max_age)
+    if ranks is None:
+        raise HTTPException(status_code=404, detail="No match statistics for this player")
+    return {"player_id": player_id, "position": position, "league": league, **ranks}
+
+@app.get("/api/players/search")
+async def search_players(q: str = "", limit: int = SEARCH_RESULT_LIMIT):
+    """Ranked, typo-tolerant player search over name, club and position"""
+    limit = max(1, min(limit, SEARCH_MAX_RESULT_LIMIT))
+    return {"query": q, "results": search_index.search(q, limit)}
+
+@app.get("/api/leaderboard")
+async def get_leaderboard(
+    week: Optional[str] = None,
+    league: str = ALL_LEAGUES,
+    position: Optional[str] = None,
+    page: int = 1,
+    per_page: int = LEADERBOARD_PAGE_SIZE,
+    q: Optional[str] = None
+):
+    """Ranked players for a week and league, one page at a time; q filters by search terms"""
+    weeks = rankings.weeks(league)
+    if week is None:
+        week = weeks[-1] if weeks else None
+    page = max(1, page)
+    per_page = max(1, min(per_page, LEADERBOARD_MAX_PAGE_SIZE))
+    q = q.strip() if q else None
+    matched = search_index.matching(q) if q else None
+    total, rows = rankings.page(week, league, position, page, per_page, matched) if week else (0, [])
+    return {
+        "week": week,
+        "weeks": weeks,
+        "league": league,
+        "position": position,
+        "q": q,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "players": rows
+    }
 
 @app.post("/login")
 async def post_login(
@@ -270,27 +1128,34 @@ async def post_login(
     password: str = Form(...)
 ):
     """Handle user login"""
-    if not players_collection:
+    try:
+        user = await players.find_one({"email": email})
+    except Exception:
+        logger.exception("Login lookup error")
         return templates.TemplateResponse("login.html", {
             "request": request,
             "message": "Database not available."
         })
 
-    user = players_collection.find_one({"email": email})
-
-    if not user:
+    if not user or not user.get("password"):
         return templates.TemplateResponse("login.html", {
             "request": request,
             "message": "Invalid email or password."
         })
 
-    stored_password = user["password"]
-    if not bcrypt.checkpw(password.encode('utf-8'), stored_password.encode('utf-8')):
+    valid, upgraded_hash = await verify_password(password, user["password"])
+    if not valid:
         return templates.TemplateResponse("login.html", {
             "request": request,
             "message": "Invalid email or password."
         })
 
+    if upgraded_hash:
+        try:
+            await players.update_one({"_id": user["_id"]}, {"$set": {"password": upgraded_hash}})
+        except Exception:
+            logger.exception("Password rehash error")
+
     token = create_access_token({"sub": str(user["_id"])})
     res = RedirectResponse(url="/dashboard", status_code=302)
     res.set_cookie("access_token", token, httponly=True, max_age=3600)
@@ -310,18 +1175,14 @@ async def submit_contact(
         "message": message,
         "created_at": datetime.utcnow()
     }
-    
-    if contact_collection:
-        try:
-            contact_collection.insert_one(contact_data)
-        except Exception as e:
-            print(f"Failed to save contact message: {e}")
-    
+    # Written in the background; journaled locally if the database is down
+    await contact_queue.put(contact_data)
     return templates.TemplateResponse("contact.html", {"request": request, "success": True})
 
 @app.post("/register")
 async def register_user(
     request: Request,
+    background_tasks: BackgroundTasks,
     userType: str = Form(...),
     firstName: Optional[str] = Form(None),
     middleName: Optional[str] = Form(None),
@@ -377,19 +1238,17 @@ async def register_user(
             }
             
             try:
-                if players_collection:
-                    players_collection.insert_one(new_player.copy())
-                else:
-                    save_to_json(new_player)
+                inserted_id = await players.insert_one(new_player.copy())
+                index_player(inserted_id, new_player)
                 
-                return JSONResponse(content={
+                return FastJSONResponse(content={
                     "success": True, 
                     "message": "Player registered successfully via API",
                     "player": new_player
                 })
             except Exception as e:
-                print(f"API registration error: {e}")
-                return JSONResponse(content={
+                logger.exception("API registration error")
+                return FastJSONResponse(content={
                     "success": False,
                     "message": f"Registration failed: {str(e)}"
                 }, status_code=500)
@@ -443,61 +1302,56 @@ async def register_user(
                     "error": f"Missing required fields: {', '.join(missing_fields)}"
                 })
             
-            # Check if email already exists
-            if players_collection:
-                existing_user = players_collection.find_one({"email": email})
-                if existing_user:
-                    return templates.TemplateResponse("register.html", {
-                        "request": request,
-                        "error": "Email already registered"
-                    })
-            
-            # Check for duplicate user by name and email
-            if players_collection:
-                duplicate_user = players_collection.find_one({
-                    "$or": [
-                        {"email": email},
-                        {"$and": [{"firstName": firstName}, {"lastName": lastName}]}
-                    ]
+            # Check for an existing user by email or name in one indexed query
+            duplicate_user = await players.find_one({
+                "$or": [
+                    {"email": email},
+                    {"$and": [{"firstName": firstName}, {"lastName": lastName}]}
+                ]
+            }, {"email": 1})
+            if duplicate_user:
+                return templates.TemplateResponse("register.html", {
+                    "request": request,
+                    "error": "Email already registered" if duplicate_user.get("email") == email
+                    else "User with these credentials already exists"
                 })
-                if duplicate_user:
-                    return templates.TemplateResponse("register.html", {
-                        "request": request,
-                        "error": "User with these credentials already exists"
-                    })
             
             # Handle photo upload
             photo_filename = None
             if playerPhoto and playerPhoto.filename:
                 try:
-                    content = await playerPhoto.read()
-                    if len(content) > 200 * 1024:  # 200KB limit
-                        return templates.TemplateResponse("register.html", {
-                            "request": request,
-                            "error": "Photo size must be 200KB or less"
-                        })
-                    
-                    # Create unique filename
-                    import time
-                    timestamp = int(time.time())
-                    file_extension = playerPhoto.filename.split('.')[-1] if '.' in playerPhoto.filename else 'jpg'
-                    photo_filename = f"{firstName.lower()}_{lastName.lower()}_{timestamp}.{file_extension}"
-                    file_path = uploads_dir / photo_filename
-                    
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(content)
-                except Exception as e:
-                    print(f"Photo upload error: {e}")
+                    photo_filename = await save_photo(playerPhoto)
+                except PhotoTooLarge:
+                    return templates.TemplateResponse("register.html", {
+                        "request": request,
+                        "error": f"Photo size must be {PHOTO_MAX_BYTES // 1024}KB or less"
+                    })
+                except InvalidPhoto as e:
+                    return templates.TemplateResponse("register.html", {
+                        "request": request,
+                        "error": str(e)
+                    })
+                except Exception:
+                    logger.exception("Photo upload error")
                     return templates.TemplateResponse("register.html", {
                         "request": request,
                         "error": "Failed to upload photo"
                     })
             
+            async def discard_new_photo():
+                # A photo another player already uses is left in place
+                if photo_filename:
+                    await discard_photo(photo_filename, photo_in_use)
+
             # Hash password
             try:
-                hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            except Exception as e:
-                print(f"Password hashing error: {e}")
+                hashed_password = await hash_password(password)
+            except PoolSaturated:
+                await discard_new_photo()
+                raise
+            except Exception:
+                logger.exception("Password hashing error")
+                await discard_new_photo()
                 return templates.TemplateResponse("register.html", {
                     "request": request,
                     "error": "Password processing failed"
@@ -539,28 +1393,39 @@ async def register_user(
             
             # Save to database
             try:
-                if players_collection:
+                if players.source == "mongodb":
                     # Remove None values and userType before saving to MongoDB
                     clean_data = {k: v for k, v in registration_data.items() if v is not None}
-                    result = players_collection.insert_one(clean_data)
-                    print(f"Player registered successfully with ID: {result.inserted_id}")
+                    inserted_id = await players.insert_one(clean_data)
+                    logger.info("Player registered", extra={"player": str(inserted_id), "storage": "mongodb"})
                 else:
-                    save_to_json(registration_data)
-                    print("Player registered successfully to JSON file")
-                
-                return RedirectResponse(url="/success", status_code=303)
-            except Exception as e:
-                print(f"Database save error: {e}")
+                    inserted_id = await save_to_json(registration_data)
+                    logger.info("Player registered", extra={"player": str(inserted_id), "storage": "json"})
+            except DuplicateKeyError:
+                # Lost a race with a concurrent registration for the same email
+                await discard_new_photo()
+                return templates.TemplateResponse("register.html", {
+                    "request": request,
+                    "error": "Email already registered"
+                })
+            except Exception:
+                logger.exception("Database save error")
                 # Try JSON fallback
                 try:
-                    save_to_json(registration_data)
-                    return RedirectResponse(url="/success", status_code=303)
-                except Exception as json_error:
-                    print(f"JSON fallback error: {json_error}")
+                    inserted_id = await save_to_json(registration_data)
+                except Exception:
+                    logger.exception("JSON fallback error")
+                    await discard_new_photo()
                     return templates.TemplateResponse("register.html", {
                         "request": request,
                         "error": "Registration failed. Please try again."
                     })
+
+            index_player(inserted_id, registration_data)
+            if photo_filename:
+                release_photo(photo_filename)
+                background_tasks.add_task(generate_thumbnails, photo_filename)
+            return RedirectResponse(url="/success", status_code=303)
         else:
             # Other user types not implemented yet
             return templates.TemplateResponse("register.html", {
@@ -568,8 +1433,10 @@ async def register_user(
                 "error": f"{userType.title()} registration coming soon!"
             })
     
-    except Exception as e:
-        print(f"Registration error: {str(e)}")
+    except PoolSaturated:
+        raise
+    except Exception:
+        logger.exception("Registration error")
         return templates.TemplateResponse("register.html", {
             "request": request,
             "error": "An unexpected error occurred. Please try again."
@@ -578,7 +1445,55 @@ async def register_user(
 @app.post("/validate-player")
 async def validate(player: Player):
     """Validate player data using Pydantic model"""
-    return {"message": "Player data is valid", "player": player.dict()}
+    return FastJSONResponse({"message": "Player data is valid", "player": player.model_dump()})
+
+@app.post("/validate-players")
+async def validate_players(request: Request):
+    """Validate many players in one request, sent as NDJSON (application/x-ndjson)
+    or a JSON array. Streams one NDJSON result per record, then a summary."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        records = ndjson_records(request.stream())
+    else:
+        try:
+            body = await asyncio.to_thread(json.loads, await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Send a JSON array or NDJSON with Content-Type: application/x-ndjson")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of players")
+        records = array_records(body)
+    results = await spool_results(records)
+    return StreamingResponse(read_results(results), media_type="application/x-ndjson")
+
+IMPORT_MAX_ERRORS = 1000
+
+@app.post("/api/players/import")
+async def import_roster(file: UploadFile = File(...), format: Optional[str] = None,
+                        access_token: str = Cookie(None)):
+    """Bulk-import a CSV or NDJSON roster; reports a summary and the first IMPORT_MAX_ERRORS row errors.
+    Clubs, scouts and admins only."""
+    await require_user_type(access_token, IMPORT_USER_TYPES)
+    roster_format = import_format(file.filename, format)
+    if roster_format is None:
+        raise HTTPException(status_code=400, detail="Upload a .csv or .ndjson roster, or pass format=csv|ndjson")
+
+    # The upload is spooled to disk by the form parser and read one chunk at a time
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    summary, errors = {}, []
+    try:
+        async for event in import_players(players, read_rows(text, roster_format), on_insert=index_player):
+            if "progress" in event:
+                summary = event["progress"]
+            elif len(errors) < IMPORT_MAX_ERRORS:
+                errors.append(event)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail={"message": "Roster is not valid UTF-8", "imported": summary})
+    finally:
+        text.detach()
+
+    logger.info("Roster imported", extra={"format": roster_format, **summary})
+    return {"summary": summary, "errors": errors,
+            "errors_truncated": summary.get("invalid", 0) + summary.get("duplicates", 0) > len(errors)}
 
 if __name__ == "__main__":
     import uvicorn
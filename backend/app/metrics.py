@@ -0,0 +1,210 @@
+import os
+import time
+import logging
+import threading
+from fastapi.templating import Jinja2Templates
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest)
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+# Prometheus metrics for request latency, database calls, the bcrypt pool and
+# template rendering. Each observation is a dict lookup and a bucket
+# increment, cheap enough to leave on. Requests slower than SLOW_REQUEST_SECONDS
+# and Mongo commands slower than SLOW_COMMAND_SECONDS are also logged.
+# With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so /metrics
+# aggregates across processes.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+SLOW_COMMAND_SECONDS = float(os.getenv("SLOW_COMMAND_SECONDS", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled", multiprocess_mode="livesum")
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency as reported by the driver",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+MONGO_COMMAND_FAILURES = Counter("mongodb_command_failures_total", "Failed MongoDB commands", ["command"])
+MONGO_POOL_CONNECTIONS = Gauge("mongodb_pool_connections", "Open MongoDB connections", multiprocess_mode="livesum")
+MONGO_POOL_CHECKED_OUT = Gauge("mongodb_pool_checked_out", "MongoDB connections in use",
+                               multiprocess_mode="livesum")
+MONGO_POOL_CHECKOUT_FAILURES = Counter("mongodb_pool_checkout_failures_total",
+                                       "Failed MongoDB connection checkouts", ["reason"])
+DB_CALL_LATENCY = Histogram("db_call_duration_seconds", "Database calls including wait for a db thread")
+DB_CALLS_IN_FLIGHT = Gauge("db_calls_in_flight", "Database calls queued or running", multiprocess_mode="livesum")
+PASSWORD_LATENCY = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify latency including pool wait",
+    ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+PASSWORD_POOL_OUTSTANDING = Gauge("password_pool_outstanding", "bcrypt calls queued or running",
+                                  multiprocess_mode="livesum")
+PASSWORD_POOL_REJECTIONS = Counter("password_pool_rejections_total", "bcrypt calls rejected with 503")
+WRITE_QUEUE_DEPTH = Gauge("write_queue_depth", "Documents waiting in a write-behind queue", ["queue"],
+                          multiprocess_mode="livesum")
+WRITE_QUEUE_JOURNALED = Counter("write_queue_journaled_total", "Documents spilled to a write-behind journal",
+                                ["queue"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "In-process cache lookups", ["cache", "result"])
+CACHE_ENTRIES = Gauge("cache_entries", "Entries held in an in-process cache", ["cache"], multiprocess_mode="livesum")
+TEMPLATE_RENDER_LATENCY = Histogram(
+    "template_render_duration_seconds", "Jinja template render time",
+    ["template"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+def render_metrics():
+    """Return (body, content_type) for the /metrics endpoint"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Records latency per route template (not per raw path, to keep label cardinality bounded)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = {}
+
+    def _route(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            # Mounts such as /static put the mounted app in scope["endpoint"]
+            router = scope.get("router")
+            paths = [r.path for r in getattr(router, "routes", [])
+                     if endpoint is getattr(r, "endpoint", None) or endpoint is getattr(r, "app", None)]
+            route = self._routes[endpoint] = paths[0] if paths else getattr(endpoint, "__name__", "unmatched")
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = self._route(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, status).observe(elapsed)
+            if elapsed >= SLOW_REQUEST_SECONDS:
+                logger.warning("Slow request", extra={
+                    "method": scope["method"], "route": route, "path": scope["path"],
+                    "status": status, "ms": round(elapsed * 1000, 1),
+                })
+
+
+class CommandTimer(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_COMMAND_LATENCY"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(seconds)
+        if seconds >= SLOW_COMMAND_SECONDS:
+            logger.warning("Slow MongoDB command", extra={
+                "command": event.command_name, "database": event.database_name, "ms": round(seconds * 1000, 1),
+            })
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name).inc()
+        logger.warning("MongoDB command failed", extra={
+            "command": event.command_name, "database": event.database_name, "error": str(event.failure),
+        })
+
+
+class InstrumentedTemplates(Jinja2Templates):
+    """Jinja2Templates that times each TemplateResponse render"""
+
+    def TemplateResponse(self, name, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().TemplateResponse(name, *args, **kwargs)
+        finally:
+            TEMPLATE_RENDER_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """pymongo pool listener keeping per-server connection counts for readiness checks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = {}
+
+    def _update(self, address, **changes):
+        key = "%s:%s" % address
+        with self._lock:
+            server = self._servers.setdefault(key, {
+                "open": 0, "checked_out": 0, "created": 0, "closed": 0, "checkout_failures": 0, "cleared": 0,
+            })
+            for field, change in changes.items():
+                server[field] += change
+
+    def snapshot(self):
+        with self._lock:
+            return {address: dict(server) for address, server in self._servers.items()}
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event.address, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc()
+        self._update(event.address, open=1, created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec()
+        self._update(event.address, open=-1, closed=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.labels(event.reason).inc()
+        self._update(event.address, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc()
+        self._update(event.address, checked_out=1)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+        self._update(event.address, checked_out=-1)
@@ -1,14 +1,75 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import List, Optional, Union
+from datetime import date
 
 class Player(BaseModel):
+    """The one player schema. Fields are snake_case in Python and aliased to the
+    camelCase keys stored in the database; payloads may use either spelling."""
+    model_config = ConfigDict(populate_by_name=True)
+
     player_id: str
-    first_name: str
-    middle_name: Optional[str] = ""
-    last_name: str
+    first_name: str = Field(alias="firstName")
+    middle_name: Optional[str] = Field("", alias="middleName")
+    last_name: str = Field(alias="lastName")
     dob: str  # YYYY-MM-DD
     nationality: str
-    preferred_position_category: str
-    preferred_position: str
+    preferred_position_category: str = Field(alias="preferredPositionCategory")
+    preferred_position: str = Field(alias="preferredPosition")
     club: str
-    photo_url: str
+    photo_url: str = Field(alias="photo")
+
+class PlayerImport(Player):
+    """A roster row for bulk import; email and league are optional, as for API registrations"""
+    email: Optional[str] = None
+    league: Optional[str] = None
+
+class BioUpdate(BaseModel):
+    """Dashboard bio edit; version is the profile version the edit was based on"""
+    player_id: Optional[str] = None
+    bio: str = Field("", max_length=2000)
+    version: Optional[int] = Field(None, ge=0)
+
+class AwardsUpdate(BaseModel):
+    """Dashboard awards edit, replacing the whole list"""
+    player_id: Optional[str] = None
+    awards: List[str] = Field(default_factory=list, max_length=50)
+    version: Optional[int] = Field(None, ge=0)
+
+    @field_validator("awards")
+    @classmethod
+    def clean_awards(cls, awards):
+        awards = [award.strip() for award in awards if award.strip()]
+        if any(len(award) > 200 for award in awards):
+            raise ValueError("Each award must be at most 200 characters")
+        return awards
+
+class MatchStatLine(BaseModel):
+    goals: int = Field(0, ge=0)
+    shotsOn: int = Field(0, ge=0)
+    shotsOff: int = Field(0, ge=0)
+    shortPassesSuccessful: int = Field(0, ge=0)
+    shortPassesUnsuccessful: int = Field(0, ge=0)
+    longPassesSuccessful: int = Field(0, ge=0)
+    longPassesUnsuccessful: int = Field(0, ge=0)
+    crossesSuccessful: int = Field(0, ge=0)
+    crossesUnsuccessful: int = Field(0, ge=0)
+    interceptions: int = Field(0, ge=0)
+    tackles: int = Field(0, ge=0)
+    clearances: int = Field(0, ge=0)
+    gkSaves: int = Field(0, ge=0)
+    yellowCards: int = Field(0, ge=0, le=2)
+    redCards: int = Field(0, ge=0, le=1)
+    fouls: int = Field(0, ge=0)
+    offsides: int = Field(0, ge=0)
+
+class MatchStatsSubmission(BaseModel):
+    player_id: Union[str, int]
+    home_team: str = Field(..., min_length=1)
+    away_team: str = Field(..., min_length=1)
+    match_date: date
+    league: str = Field(..., min_length=1)
+    stats: MatchStatLine
+    performance_rating: Optional[float] = None  # client preview only; recomputed server-side
+    match_duration: Optional[str] = None
+    extra_time: int = Field(0, ge=0)
+    idempotency_key: Optional[str] = None
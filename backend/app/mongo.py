@@ -0,0 +1,75 @@
+import os
+import time
+import threading
+from pymongo import MongoClient
+from app.db import DB_MAX_WORKERS
+from app.metrics import CommandTimer, PoolStats
+
+# One MongoClient per process, shared by the app and the scripts. It is built
+# on first use with connect=False, so importing the app (or forking uvicorn
+# workers) opens no sockets; the app pings it from a startup hook instead, so
+# a bad URI or unreachable cluster shows up at boot rather than on the first
+# request. Every blocking call runs on one of the DB_MAX_WORKERS db threads,
+# each holding at most one connection, so the pool is sized to match.
+MONGO_URI = os.getenv("MONGO_URI")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "enejistats")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", str(DB_MAX_WORKERS + 4)))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+MONGO_RETRY_WRITES = os.getenv("MONGO_RETRY_WRITES", "true").lower() == "true"
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+pool_stats = PoolStats()
+_client = None
+_lock = threading.Lock()
+
+
+def client_settings():
+    """Options passed to MongoClient; settings in the URI take precedence"""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "compressors": MONGO_COMPRESSORS,
+        "retryWrites": MONGO_RETRY_WRITES,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+
+
+def get_client():
+    """Return the shared client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if not MONGO_URI:
+                    raise RuntimeError("MONGO_URI is not set")
+                settings = client_settings()
+                # Options already in the URI win over the environment defaults
+                lowered = MONGO_URI.lower()
+                settings = {key: value for key, value in settings.items() if f"{key.lower()}=" not in lowered}
+                _client = MongoClient(MONGO_URI, connect=False, event_listeners=[CommandTimer(), pool_stats],
+                                      **settings)
+    return _client
+
+
+def get_database(name=MONGO_DB_NAME):
+    return get_client()[name]
+
+
+def ping():
+    """Round-trip to the server; returns the latency in milliseconds"""
+    start = time.perf_counter()
+    get_client().admin.command("ping")
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def close_client():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,79 @@
+import os
+import time
+import hashlib
+from pathlib import Path
+from starlette.responses import Response
+from app.compression import compress_variants, choose_encoding
+from app.metrics import TEMPLATE_RENDER_LATENCY
+
+# Rendered-page cache for routes whose HTML does not depend on the visitor.
+# A page is rendered once, stored as bytes in every encoding with a strong
+# ETag per variant, and re-rendered only when its template file changes.
+# Repeat visits that send If-None-Match are answered with an empty 304.
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "300"))
+
+
+class Page:
+    def __init__(self, body, version=None):
+        self.version = version
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = compress_variants(body)
+        self.etags = {encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+                      for encoding in self.variants}
+
+    def matches(self, if_none_match):
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return any(etag in tags for etag in self.etags.values())
+
+
+class PageCache:
+    """Serves template pages from prerendered, precompressed bytes"""
+
+    def __init__(self, templates, directory):
+        self.templates = templates
+        self.directory = Path(directory)
+        self.renders = 0
+        self._pages = {}
+
+    def _template_page(self, name):
+        version = os.stat(self.directory / name).st_mtime_ns
+        page = self._pages.get(name)
+        if page is None or page.version != version:
+            start = time.perf_counter()
+            body = self.templates.get_template(name).render().encode("utf-8")
+            TEMPLATE_RENDER_LATENCY.labels(name).observe(time.perf_counter() - start)
+            page = self._pages[name] = Page(body, version)
+            self.renders += 1
+        return page
+
+    def _static_page(self, key, html):
+        page = self._pages.get(key)
+        if page is None:
+            page = self._pages[key] = Page(html.encode("utf-8"))
+            self.renders += 1
+        return page
+
+    def respond(self, request, page):
+        encoding = choose_encoding(request.headers.get("accept-encoding"), page.variants)
+        headers = {
+            "ETag": page.etags[encoding],
+            "Cache-Control": f"public, max-age={PAGE_CACHE_MAX_AGE}",
+            "Vary": "Accept-Encoding",
+        }
+        if page.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(page.variants[encoding], media_type="text/html; charset=utf-8", headers=headers)
+
+    def serve(self, request, name):
+        """Respond with a template rendered without per-request context"""
+        return self.respond(request, self._template_page(name))
+
+    def serve_html(self, request, key, html):
+        """Respond with a fixed HTML string, compressed on first use"""
+        return self.respond(request, self._static_page(key, html))
@@ -0,0 +1,86 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from app.metrics import PASSWORD_LATENCY, PASSWORD_POOL_OUTSTANDING, PASSWORD_POOL_REJECTIONS
+
+# bcrypt is deliberately slow, so hashing and checking run in a dedicated
+# process pool instead of on the event loop. Work beyond PASSWORD_MAX_QUEUE
+# outstanding calls is rejected with PoolSaturated, which the app turns into
+# a fast 503 rather than letting logins queue up behind each other.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(os.cpu_count() or 1)))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", str(PASSWORD_POOL_SIZE * 8)))
+
+_pool = None
+_outstanding = 0
+
+
+class PoolSaturated(Exception):
+    """Raised when the password pool already has PASSWORD_MAX_QUEUE calls waiting"""
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def hash_cost(hashed: str):
+    """Return the cost factor encoded in a bcrypt hash"""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _hash(password: str, rounds: int):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password: str, hashed: str, rounds: int):
+    if not bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8")):
+        return False, None
+    cost = hash_cost(hashed)
+    if cost is not None and cost < rounds:
+        return True, _hash(password, rounds)
+    return True, None
+
+
+async def _submit(operation, func, *args):
+    global _outstanding
+    if _outstanding >= PASSWORD_MAX_QUEUE:
+        PASSWORD_POOL_REJECTIONS.inc()
+        raise PoolSaturated()
+    _outstanding += 1
+    PASSWORD_POOL_OUTSTANDING.inc()
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), func, *args)
+    finally:
+        _outstanding -= 1
+        PASSWORD_POOL_OUTSTANDING.dec()
+        PASSWORD_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+async def hash_password(password: str):
+    """Hash a password with the configured cost factor"""
+    return await _submit("hash", _hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: str):
+    """Check a password; returns (valid, upgraded_hash) where upgraded_hash is set
+    when the stored hash used a lower cost than BCRYPT_ROUNDS"""
+    return await _submit("verify", _check, password, hashed, BCRYPT_ROUNDS)
+
+
+def shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=True)
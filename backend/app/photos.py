@@ -0,0 +1,176 @@
+import os
+import logging
+import asyncio
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from PIL import Image
+
+# Player photos are streamed to disk in chunks, checked to be a real image and
+# stored under the SHA-256 of their content, so the same picture uploaded twice
+# is kept once. Because a stored file can be shared, a failed registration only
+# deletes its photo when no other registration in flight or stored player uses
+# it. Small thumbnails for list pages (leaderboard, browse) are generated after
+# the response is sent, off the request path.
+PHOTO_MAX_BYTES = 200 * 1024
+PHOTO_CHUNK_SIZE = 64 * 1024
+PHOTO_EXTENSIONS = {"jpg", "jpeg", "png", "webp", "gif"}
+# Formats Pillow may detect, mapped to the extension the photo is stored under
+PHOTO_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+THUMBNAIL_SIZES = {"sm": 64, "md": 160}
+
+logger = logging.getLogger(__name__)
+
+uploads_dir = Path("static/uploads")
+thumbs_dir = uploads_dir / "thumbs"
+
+# Registrations in flight per stored filename; _store_lock orders moving a new
+# photo into place against deleting a discarded one
+_claims = Counter()
+_store_lock = threading.Lock()
+
+
+class PhotoTooLarge(Exception):
+    pass
+
+
+class InvalidPhoto(Exception):
+    pass
+
+
+def _extension(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else "jpg"
+    if extension not in PHOTO_EXTENSIONS:
+        raise InvalidPhoto(f"Unsupported photo type: {extension}")
+    return "jpg" if extension == "jpeg" else extension
+
+
+def _open_temp():
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=uploads_dir, suffix=".part")
+    return os.fdopen(fd, "wb"), path
+
+
+def _verify(path):
+    """Return the stored extension for the image at path; raises InvalidPhoto if it is not one"""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+    except Exception:
+        raise InvalidPhoto("Photo must be a JPEG, PNG, WebP or GIF image")
+    if image_format not in PHOTO_FORMATS:
+        raise InvalidPhoto(f"Unsupported photo type: {image_format}")
+    return PHOTO_FORMATS[image_format]
+
+
+def _finalize(temp_path, filename):
+    """Move the temp file into place unless the same content is already stored"""
+    target = uploads_dir / filename
+    with _store_lock:
+        if target.exists():
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, target)
+
+
+def _remove_unclaimed(filename):
+    with _store_lock:
+        if not _claims[filename]:
+            (uploads_dir / filename).unlink(missing_ok=True)
+
+
+async def save_photo(upload):
+    """Stream an UploadFile to content-addressed storage and return its
+    filename. The caller holds a claim on the file until release_photo or
+    discard_photo.
+
+    Raises PhotoTooLarge as soon as PHOTO_MAX_BYTES is exceeded, without
+    reading the rest of the upload, and InvalidPhoto unless the content is an
+    image in one of PHOTO_FORMATS; the stored extension follows the content.
+    """
+    _extension(upload.filename)
+    if getattr(upload, "size", None) and upload.size > PHOTO_MAX_BYTES:
+        raise PhotoTooLarge()
+
+    digest = hashlib.sha256()
+    received = 0
+    out, temp_path = await asyncio.to_thread(_open_temp)
+    try:
+        while True:
+            chunk = await upload.read(PHOTO_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > PHOTO_MAX_BYTES:
+                raise PhotoTooLarge()
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+        extension = await asyncio.to_thread(_verify, temp_path)
+    except BaseException:
+        out.close()
+        await asyncio.to_thread(os.remove, temp_path)
+        raise
+
+    filename = f"{digest.hexdigest()}.{extension}"
+    _claims[filename] += 1
+    try:
+        await asyncio.to_thread(_finalize, temp_path, filename)
+    except BaseException:
+        release_photo(filename)
+        raise
+    return filename
+
+
+def release_photo(filename):
+    """Drop a registration's claim on its photo once the player is stored"""
+    _claims[filename] -= 1
+    if _claims[filename] <= 0:
+        del _claims[filename]
+
+
+async def discard_photo(filename, is_referenced):
+    """Release the photo of a registration that failed and delete it, unless
+    another registration holds it or await is_referenced(filename) is true"""
+    release_photo(filename)
+    if _claims[filename] or await is_referenced(filename):
+        return
+    await asyncio.to_thread(_remove_unclaimed, filename)
+
+
+def thumbnail_path(filename, size):
+    return thumbs_dir / f"{filename.rsplit('.', 1)[0]}_{size}.webp"
+
+
+def thumbnail_url(filename, size="sm"):
+    """URL of a photo's thumbnail, or of the full image until the thumbnail
+    has been generated (and for photos stored before thumbnails existed)."""
+    if not filename:
+        return None
+    if "/" in filename:
+        # Legacy API registrations store an absolute photo URL
+        return filename
+    thumbnail = thumbnail_path(filename, size)
+    if thumbnail.exists():
+        return f"/static/uploads/thumbs/{thumbnail.name}"
+    return f"/static/uploads/{filename}"
+
+
+def generate_thumbnails(filename):
+    """Create every THUMBNAIL_SIZES variant for a stored photo; safe to call repeatedly"""
+    thumbs_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with Image.open(uploads_dir / filename) as image:
+            image = image.convert("RGB")
+            for size, pixels in THUMBNAIL_SIZES.items():
+                target = thumbnail_path(filename, size)
+                if target.exists():
+                    continue
+                thumb = image.copy()
+                thumb.thumbnail((pixels, pixels))
+                thumb.save(target, "WEBP", quality=80)
+    except Exception as e:
+        logger.warning("Thumbnail generation failed", extra={"photo": filename, "error": str(e)})
@@ -0,0 +1,57 @@
+import numpy as np
+
+# Server-side match rating. Mirrors calculateLiveRating() in
+# static/js/player-data-scout-widget.js, which remains a live preview only;
+# the stored rating is always the one computed here. Ratings are computed as
+# one matrix product so a whole matchday can be rescored at once when the
+# weights change.
+RATING_BASE = 6.0
+RATING_MIN = 1.0
+RATING_MAX = 10.0
+
+RATING_WEIGHTS = {
+    "goals": 1.0,
+    "shotsOn": 0.2,
+    "shotsOff": -0.1,
+    "shortPassesSuccessful": 0.05,
+    "shortPassesUnsuccessful": -0.05,
+    "longPassesSuccessful": 0.05,
+    "longPassesUnsuccessful": -0.05,
+    "crossesSuccessful": 0.1,
+    "crossesUnsuccessful": -0.05,
+    "interceptions": 0.3,
+    "tackles": 0.2,
+    "clearances": 0.1,
+    "gkSaves": 0.4,
+    "yellowCards": -0.5,
+    "redCards": -2.0,
+    "fouls": -0.1,
+    "offsides": -0.2,
+}
+
+STAT_FIELDS = list(RATING_WEIGHTS)
+_weights = np.array([RATING_WEIGHTS[field] for field in STAT_FIELDS], dtype=np.float64)
+
+
+def stat_matrix(stat_lines):
+    """Stack stat dicts into an (n, len(STAT_FIELDS)) matrix; missing metrics count as 0"""
+    matrix = np.zeros((len(stat_lines), len(STAT_FIELDS)), dtype=np.float64)
+    for row, stats in enumerate(stat_lines):
+        matrix[row] = [stats.get(field, 0) for field in STAT_FIELDS]
+    return matrix
+
+
+def rate_matrix(matrix):
+    """Vector of ratings for a stat matrix, clamped and rounded like the widget"""
+    ratings = np.clip(RATING_BASE + matrix @ _weights, RATING_MIN, RATING_MAX)
+    return np.round(ratings, 1)
+
+
+def rate_many(stat_lines):
+    if not stat_lines:
+        return []
+    return rate_matrix(stat_matrix(stat_lines)).tolist()
+
+
+def rate(stats):
+    return rate_many([stats])[0]
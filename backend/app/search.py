@@ -0,0 +1,216 @@
+import re
+import heapq
+import threading
+from collections import Counter
+from itertools import chain, islice
+from sortedcontainers import SortedList
+
+# In-process player search. Every indexed field is split into lower-case tokens
+# kept in a SortedList, so all tokens starting with a prefix form one
+# contiguous range found by bisection. Each token's postings are kept in name
+# order, so a broad term is answered by walking its postings in order and
+# stopping at the limit instead of collecting every match. Whether a player
+# also satisfies the other query terms is checked against that player's own
+# handful of tokens. A trigram index over the tokens supplies candidates for
+# typo-tolerant matching when a term has no exact or prefix hit. Each query
+# term must match; players are ranked by exact hits, then by name.
+SEARCH_FIELDS = ("firstName", "lastName", "club", "preferredPosition", "preferredPositionCategory")
+SEARCH_MAX_PREFIX_TOKENS = 200
+# Terms matching at most this many postings are ranked in full; broader
+# multi-term queries stop once the limit is filled with best-ranked players,
+# and otherwise rank the first this many matches in name order.
+SEARCH_MAX_CANDIDATES = 2000
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+_split = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def tokenize(text):
+    return [token for token in _split.split(str(text).lower()) if token]
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _within_distance(a, b, limit):
+    """Optimal string alignment (Damerau) distance check, so a swap of two
+    adjacent letters counts as one edit; stops once limit is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        # A transposition reaches back two rows, so both must be over the limit
+        if min(current) > limit and min(previous) > limit:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= limit
+
+
+def _in_name_order(postings):
+    """Merge name-ordered postings into one stream of distinct player ids"""
+    last = None
+    for key in heapq.merge(*postings):
+        if key != last:
+            last = key
+            yield key[1]
+
+
+class SearchIndex:
+    """Prefix and trigram index over player names, clubs and positions"""
+
+    def __init__(self):
+        self._tokens = SortedList()
+        self._postings = {}
+        self._trigram_tokens = {}
+        self._player_tokens = {}
+        self._players = {}
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._players)
+
+    def add(self, player_id, player, summary):
+        """Index (or re-index) one player; summary is what search results return"""
+        player_id = str(player_id)
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            if player.get(field):
+                tokens.update(tokenize(player[field]))
+        with self._lock:
+            self._remove(player_id)
+            name = (summary.get("name") or "").lower()
+            self._players[player_id] = summary
+            self._names[player_id] = name
+            self._player_tokens[player_id] = tokens
+            for token in tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = SortedList()
+                    self._tokens.add(token)
+                    for trigram in _trigrams(token):
+                        self._trigram_tokens.setdefault(trigram, set()).add(token)
+                postings.add((name, player_id))
+
+    def remove(self, player_id):
+        with self._lock:
+            self._remove(str(player_id))
+
+    def _remove(self, player_id):
+        key = (self._names.get(player_id), player_id)
+        for token in self._player_tokens.pop(player_id, ()):
+            postings = self._postings[token]
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                self._tokens.remove(token)
+                for trigram in _trigrams(token):
+                    self._trigram_tokens[trigram].discard(token)
+        self._players.pop(player_id, None)
+        self._names.pop(player_id, None)
+
+    def _match_term(self, term):
+        """Return (tokens, base_score) for one query term.
+
+        tokens are every indexed token starting with the term, or, when there
+        is none, every token within a small edit distance of it.
+        """
+        start = self._tokens.bisect_left(term)
+        prefix = []
+        for token in self._tokens.islice(start, start + SEARCH_MAX_PREFIX_TOKENS):
+            if not token.startswith(term):
+                break
+            prefix.append(token)
+        if prefix or len(term) < 3:
+            return set(prefix), PREFIX_SCORE
+
+        limit = 1 if len(term) <= 7 else 2
+        grams = _trigrams(term)
+        counts = Counter(chain.from_iterable(self._trigram_tokens.get(gram, ()) for gram in grams))
+        # One edit changes at most three trigrams, a transposition four
+        needed = max(1, len(grams) - 4 * limit)
+        fuzzy = {
+            token for token, shared in counts.items()
+            if shared >= needed and abs(len(token) - len(term)) <= limit
+            and _within_distance(term, token, limit)
+        }
+        return fuzzy, FUZZY_SCORE
+
+    def matching(self, query):
+        """Ids of every player matching all terms of query, for filtering
+        other listings by the same rules as search"""
+        terms = tokenize(query)
+        if not terms:
+            return set()
+        with self._lock:
+            matches = [self._match_term(term)[0] for term in terms]
+            sizes = [sum(len(self._postings[token]) for token in tokens) for tokens in matches]
+            if not all(sizes):
+                return set()
+            driver = min(range(len(matches)), key=sizes.__getitem__)
+            others = [tokens for index, tokens in enumerate(matches) if index != driver]
+            return {player_id for token in matches[driver] for _, player_id in self._postings[token]
+                    if all(not self._player_tokens[player_id].isdisjoint(matched) for matched in others)}
+
+    def search(self, query, limit=10):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            matches = [(term, *self._match_term(term)) for term in terms]
+            sizes = [sum(len(self._postings[token]) for token in tokens) for _, tokens, _ in matches]
+            if not all(sizes):
+                return []
+            # Drive the search from the most selective term; the rest are
+            # checked against each candidate's own tokens.
+            driver = min(range(len(matches)), key=sizes.__getitem__)
+            others = [tokens for index, (_, tokens, _) in enumerate(matches) if index != driver]
+            postings = [self._postings[token] for token in matches[driver][1]]
+
+            def accepted(player_id):
+                tokens = self._player_tokens[player_id]
+                return all(any(token in matched for token in tokens) for matched in others)
+
+            def exact_hits(player_id):
+                tokens = self._player_tokens[player_id]
+                return sum(term in tokens for term, _, _ in matches)
+
+            if sizes[driver] <= SEARCH_MAX_CANDIDATES:
+                candidates = {player_id for entries in postings for _, player_id in entries if accepted(player_id)}
+                ranked = heapq.nsmallest(limit, candidates,
+                                         key=lambda player_id: (-exact_hits(player_id), self._names[player_id]))
+            elif not others:
+                # One broad term: exact token hits first, each group in name
+                # order, so both walks stop as soon as the limit is reached.
+                term = matches[driver][0]
+                ranked = [player_id for _, player_id in islice(self._postings.get(term, ()), limit)]
+                rest = (player_id for player_id in _in_name_order(postings)
+                        if term not in self._player_tokens[player_id])
+                ranked.extend(islice(rest, limit - len(ranked)))
+            else:
+                # Walk in name order until limit players have the best possible
+                # number of exact hits, since nothing later can outrank them
+                best = sum(term in self._postings for term, _, _ in matches)
+                hits, top = {}, 0
+                for player_id in filter(accepted, _in_name_order(postings)):
+                    hits[player_id] = exact_hits(player_id)
+                    top += hits[player_id] == best
+                    if top >= limit or len(hits) >= SEARCH_MAX_CANDIDATES:
+                        break
+                # Candidates arrive in name order, and the sort is stable
+                ranked = sorted(hits, key=lambda player_id: -hits[player_id])[:limit]
+
+            base = sum(score for _, _, score in matches)
+            return [dict(self._players[player_id], player_id=player_id,
+                         score=base + exact_hits(player_id) * (EXACT_SCORE - PREFIX_SCORE))
+                    for player_id in ranked]
@@ -0,0 +1,216 @@
+import threading
+from datetime import date
+import numpy as np
+from app.ratings import STAT_FIELDS
+
+# Player comparison over per-90 stat vectors. Every player's latest season
+# aggregate is one row of a contiguous float64 matrix, with parallel arrays
+# for minutes, position category, league and date of birth so filters are
+# vectorised masks. Rows are replaced in place as aggregates change, and the
+# column sums behind the normalising scale are adjusted by the old and new row,
+# so nothing is rebuilt per query. Squared values are kept alongside the
+# vectors, letting a weighted distance to every row be expanded into two
+# matrix-vector products instead of materialising a difference matrix.
+SIMILARITY_MIN_MINUTES = 90
+SIMILARITY_INITIAL_CAPACITY = 1024
+SIMILARITY_GATHER_RATIO = 4
+
+
+def _birth_ordinal(dob):
+    try:
+        return float(date.fromisoformat(str(dob)[:10]).toordinal())
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _years_before(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 29 February in a non-leap target year
+        return today.replace(year=today.year - years, day=28)
+
+
+class SimilarityIndex:
+    """k-nearest-neighbour and percentile queries over normalised per-90 vectors"""
+
+    def __init__(self, capacity=SIMILARITY_INITIAL_CAPACITY):
+        self._vectors = np.zeros((capacity, len(STAT_FIELDS)), dtype=np.float64)
+        self._squares = np.zeros((capacity, len(STAT_FIELDS)), dtype=np.float64)
+        self._column_sums = np.zeros(len(STAT_FIELDS), dtype=np.float64)
+        self._column_squares = np.zeros(len(STAT_FIELDS), dtype=np.float64)
+        self._qualified = 0
+        self._minutes = np.zeros(capacity, dtype=np.float64)
+        self._positions = np.full(capacity, -1, dtype=np.int32)
+        self._leagues = np.full(capacity, -1, dtype=np.int32)
+        self._births = np.full(capacity, np.nan, dtype=np.float64)
+        self._size = 0
+        self._ids = []
+        self._rows = {}
+        self._seasons = {}
+        self._meta = {}
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _code(self, value):
+        if not value:
+            return -1
+        return self._codes.setdefault(str(value).lower(), len(self._codes))
+
+    def _grow(self):
+        capacity = len(self._minutes) * 2
+        for name in ("_vectors", "_squares"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, len(STAT_FIELDS)), dtype=np.float64)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name, fill in (("_minutes", 0.0), ("_positions", -1), ("_leagues", -1), ("_births", np.nan)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _count(self, row, sign):
+        """Add or remove a row's contribution to the normalising column statistics"""
+        if self._minutes[row] >= SIMILARITY_MIN_MINUTES:
+            self._column_sums += sign * self._vectors[row]
+            self._column_squares += sign * self._squares[row]
+            self._qualified += sign
+
+    def _write_meta(self, row, meta):
+        self._positions[row], self._leagues[row], self._births[row] = meta
+
+    def set_player(self, player_id, position_category, league, dob):
+        """Record the fields queries filter on; safe before or after update()"""
+        player_id = str(player_id)
+        meta = (self._code(position_category), self._code(league), _birth_ordinal(dob))
+        with self._lock:
+            self._meta[player_id] = meta
+            if player_id in self._rows:
+                self._write_meta(self._rows[player_id], meta)
+
+    def update(self, player_id, season, per_90, minutes):
+        """Set a player's vector from a season aggregate, keeping the latest season"""
+        player_id = str(player_id)
+        with self._lock:
+            if season < self._seasons.get(player_id, ""):
+                return
+            self._seasons[player_id] = season
+            row = self._rows.get(player_id)
+            if row is None:
+                if self._size == len(self._minutes):
+                    self._grow()
+                row = self._rows[player_id] = self._size
+                self._ids.append(player_id)
+                self._size += 1
+                self._write_meta(row, self._meta.get(player_id, (-1, -1, np.nan)))
+            else:
+                self._count(row, -1)
+            self._vectors[row] = [per_90.get(field, 0.0) for field in STAT_FIELDS]
+            self._squares[row] = self._vectors[row] ** 2
+            self._minutes[row] = minutes
+            self._count(row, 1)
+
+    def remove(self, player_id):
+        """Drop a player's row by moving the last row into its slot"""
+        player_id = str(player_id)
+        with self._lock:
+            row = self._rows.pop(player_id, None)
+            self._seasons.pop(player_id, None)
+            if row is None:
+                return
+            self._count(row, -1)
+            last = self._size - 1
+            if row != last:
+                moved = self._ids[last]
+                for array in (self._vectors, self._squares, self._minutes, self._positions, self._leagues, self._births):
+                    array[row] = array[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+            self._size -= 1
+
+    def _weights(self):
+        """Inverse column variance over qualified rows, so every metric counts equally"""
+        if self._qualified < 2:
+            return np.ones(len(STAT_FIELDS))
+        mean = self._column_sums / self._qualified
+        variance = self._column_squares / self._qualified - mean ** 2
+        return 1.0 / np.where(variance > 1e-9, variance, 1.0)
+
+    def _mask(self, position_category=None, league=None, min_age=None, max_age=None):
+        size = self._size
+        mask = self._minutes[:size] >= SIMILARITY_MIN_MINUTES
+        if position_category:
+            mask &= self._positions[:size] == self._codes.get(str(position_category).lower(), -2)
+        if league:
+            mask &= self._leagues[:size] == self._codes.get(str(league).lower(), -2)
+        if min_age is not None or max_age is not None:
+            today = date.today()
+            births = self._births[:size]
+            known = ~np.isnan(births)
+            if min_age is not None:
+                known &= births <= _years_before(today, min_age).toordinal()
+            if max_age is not None:
+                known &= births > _years_before(today, max_age + 1).toordinal()
+            mask &= known
+        return mask
+
+    def _narrow(self, rows):
+        """Whether a filter is selective enough that gathering its rows beats a full pass"""
+        return len(rows) * SIMILARITY_GATHER_RATIO < self._size
+
+    def similar(self, player_id, k=10, **filters):
+        """Closest k players to player_id as (player_id, distance, season) tuples, or None if not indexed"""
+        with self._lock:
+            row = self._rows.get(str(player_id))
+            if row is None:
+                return None
+            mask = self._mask(**filters)
+            mask[row] = False
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return []
+            # sum(w * (x - q)^2) = x^2 . w - 2 x . (w * q) + q^2 . w
+            weights = self._weights()
+            query = self._vectors[row]
+            if self._narrow(rows):
+                distances = self._squares[rows] @ weights - 2 * (self._vectors[rows] @ (weights * query))
+            else:
+                size = self._size
+                distances = (self._squares[:size] @ weights - 2 * (self._vectors[:size] @ (weights * query)))[rows]
+            distances = np.maximum(distances + self._squares[row] @ weights, 0.0)
+            k = min(k, len(rows))
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+            return [(self._ids[rows[i]], round(float(np.sqrt(distances[i])), 4), self._seasons[self._ids[rows[i]]])
+                    for i in nearest]
+
+    def percentiles(self, player_id, **filters):
+        """Per-metric percentile rank (0-100) of a player among the filtered peers"""
+        with self._lock:
+            row = self._rows.get(str(player_id))
+            if row is None:
+                return None
+            mask = self._mask(**filters)
+            mask[row] = True
+            rows = np.flatnonzero(mask)
+            vector = self._vectors[row]
+            if self._narrow(rows):
+                peers = self._vectors[rows]
+                below, at_or_below = (peers < vector).sum(axis=0), (peers <= vector).sum(axis=0)
+            else:
+                matrix = self._vectors[:self._size]
+                weights = mask.astype(np.float64)
+                below, at_or_below = weights @ (matrix < vector), weights @ (matrix <= vector)
+            # Ties count half, so a metric everyone shares ranks at the 50th percentile
+            ranks = 50.0 * (below + at_or_below) / len(rows)
+            return {
+                "peers": int(len(rows)),
+                "season": self._seasons[str(player_id)],
+                "per_90": dict(zip(STAT_FIELDS, vector.round(2).tolist())),
+                "percentiles": dict(zip(STAT_FIELDS, ranks.round(1).tolist())),
+            }
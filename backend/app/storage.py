@@ -0,0 +1,403 @@
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from bson.objectid import ObjectId
+
+# Local storage engine for the JSON fallback. Records live in an append-only
+# JSON Lines log: inserts and updates append one line, and the newest line for
+# an _id wins. An in-memory index maps _id to the byte offset of its newest
+# line, plus email and first/last name keys for duplicate checks, so a write is
+# O(1) regardless of how many players are stored. Superseded lines are removed
+# by compaction once they outnumber live records.
+FSYNC_BATCH = int(os.getenv("STORAGE_FSYNC_BATCH", "32"))
+FSYNC_INTERVAL = float(os.getenv("STORAGE_FSYNC_INTERVAL", "1.0"))
+COMPACT_MIN_GARBAGE = int(os.getenv("STORAGE_COMPACT_MIN_GARBAGE", "1000"))
+COMPACT_RATIO = float(os.getenv("STORAGE_COMPACT_RATIO", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode(document):
+    return (json.dumps(document, default=_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _compare(value, condition):
+    for operator, operand in condition.items():
+        if operator == "$in":
+            if value not in operand:
+                return False
+        elif operator == "$exists":
+            if (value is not None) != bool(operand):
+                return False
+        elif value is None:
+            return False
+        elif operator == "$gt" and not value > operand:
+            return False
+        elif operator == "$gte" and not value >= operand:
+            return False
+        elif operator == "$lt" and not value < operand:
+            return False
+        elif operator == "$lte" and not value <= operand:
+            return False
+    return True
+
+
+def matches(document, filter):
+    """Evaluate the subset of Mongo filters the app uses: equality, $or, $and
+    and the $in/$exists/$gt/$gte/$lt/$lte comparisons"""
+    for key, expected in filter.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in expected):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict) and expected and all(k.startswith("$") for k in expected):
+            if not _compare(document.get(key), expected):
+                return False
+        elif document.get(key) != expected:
+            return False
+    return True
+
+
+def increment(document, path, amount):
+    """Apply a Mongo-style $inc on a dotted path, creating nested fields as needed"""
+    *parents, field = path.split(".")
+    for parent in parents:
+        document = document.setdefault(parent, {})
+    document[field] = document.get(field, 0) + amount
+
+
+def apply_update(document, update):
+    """Apply the Mongo update operators the app uses: $set, $inc and $push (with $each)"""
+    document.update(update.get("$set", {}))
+    for path, amount in update.get("$inc", {}).items():
+        increment(document, path, amount)
+    for field, value in update.get("$push", {}).items():
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        document[field] = list(document.get(field) or []) + list(items)
+
+
+def _name_key(document):
+    if document.get("firstName") and document.get("lastName"):
+        return (document["firstName"], document["lastName"])
+    return None
+
+
+class JsonlStore:
+    """Append-only JSON Lines log with an in-memory index"""
+
+    def __init__(self, path, legacy_path=None):
+        self.path = Path(path)
+        self.lock_path = Path(f"{path}.lock")
+        self._lock = threading.RLock()
+        self._pending_sync = 0
+        self._last_sync = time.monotonic()
+        with self._file_lock(fcntl.LOCK_EX):
+            self._migrate(legacy_path)
+        self._reset()
+        with self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+
+    def _reset(self):
+        self._offsets = {}
+        self._order = []
+        self._by_email = {}
+        self._by_name = {}
+        self._lines = 0
+        self._end = 0
+        self._inode = None
+
+    def _file_lock(self, mode):
+        store = self
+
+        class _FileLock:
+            def __enter__(self):
+                store._lock.acquire()
+                self.fd = open(store.lock_path, "a")
+                fcntl.flock(self.fd, mode)
+
+            def __exit__(self, *exc):
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+                self.fd.close()
+                store._lock.release()
+
+        return _FileLock()
+
+    def _migrate(self, legacy_path):
+        """Convert a legacy registrations.json array into the log once"""
+        if not legacy_path or self.path.exists():
+            return
+        legacy = Path(legacy_path)
+        if not legacy.exists():
+            return
+        with open(legacy, "r") as f:
+            documents = json.load(f)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            for document in documents:
+                document.setdefault("_id", str(ObjectId()))
+                f.write(encode(document))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        legacy.rename(legacy.with_suffix(".json.migrated"))
+        logger.info("Migrated legacy registrations", extra={"count": len(documents), "source": str(legacy),
+                                                             "target": str(self.path)})
+
+    def _index(self, document, offset):
+        _id = document["_id"]
+        previous = self._offsets.get(_id)
+        if previous is None:
+            self._order.append(_id)
+        else:
+            old = self._read_at(previous)
+            if old.get("email") and self._by_email.get(old["email"]) == _id:
+                del self._by_email[old["email"]]
+            old_name = _name_key(old)
+            if old_name and self._by_name.get(old_name) == _id:
+                del self._by_name[old_name]
+        self._offsets[_id] = offset
+        if document.get("email"):
+            self._by_email[document["email"]] = _id
+        name = _name_key(document)
+        if name:
+            self._by_name[name] = _id
+        self._lines += 1
+
+    def _catch_up(self):
+        """Index lines appended since the last read, e.g. by another worker process"""
+        if not self.path.exists():
+            return
+        stat = os.stat(self.path)
+        if self._inode is not None and stat.st_ino != self._inode:
+            # The log was compacted by another process; rebuild from scratch.
+            self._reset()
+        self._inode = stat.st_ino
+        if stat.st_size <= self._end:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._end)
+            offset = self._end
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash; ignore the partial tail.
+                    break
+                if line.strip():
+                    self._index(json.loads(line), offset)
+                offset += len(line)
+            self._end = offset
+
+    def _read_at(self, offset, f=None):
+        if f is None:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                return json.loads(f.readline())
+        f.seek(offset)
+        return json.loads(f.readline())
+
+    def _append(self, document):
+        data = encode(document)
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+            f.flush()
+            self._pending_sync += 1
+            if self._pending_sync >= FSYNC_BATCH or time.monotonic() - self._last_sync >= FSYNC_INTERVAL:
+                os.fsync(f.fileno())
+                self._pending_sync = 0
+                self._last_sync = time.monotonic()
+        self._inode = os.stat(self.path).st_ino
+        self._index(document, offset)
+        self._end = offset + len(data)
+
+    def _candidates(self, filter):
+        """Resolve a filter to candidate _ids through the index, or None to scan"""
+        if "_id" in filter:
+            if isinstance(filter["_id"], dict):
+                if "$in" in filter["_id"]:
+                    return [_id for _id in filter["_id"]["$in"] if _id in self._offsets]
+                return None
+            return [filter["_id"]] if filter["_id"] in self._offsets else []
+        if "email" in filter and not isinstance(filter["email"], dict):
+            _id = self._by_email.get(filter["email"])
+            return [_id] if _id else []
+        if isinstance(filter.get("firstName"), str) and isinstance(filter.get("lastName"), str):
+            _id = self._by_name.get((filter["firstName"], filter["lastName"]))
+            return [_id] if _id else []
+        if "$and" in filter and not any(key.startswith("$") for clause in filter["$and"] for key in clause):
+            merged = {}
+            for clause in filter["$and"]:
+                merged.update(clause)
+            return self._candidates(merged)
+        for operator in ("$or", "$and"):
+            if operator in filter:
+                clauses = [self._candidates(clause) for clause in filter[operator]]
+                if operator == "$or" and any(c is None for c in clauses):
+                    return None
+                found = []
+                for clause in clauses:
+                    for _id in clause or []:
+                        if _id not in found:
+                            found.append(_id)
+                if operator == "$and" and all(c is None for c in clauses):
+                    return None
+                return found
+        return None
+
+    def _find(self, filter, limit):
+        candidates = self._candidates(filter)
+        ids = self._order if candidates is None else candidates
+        results = []
+        if not ids:
+            return results
+        with open(self.path, "rb") as f:
+            for _id in ids:
+                document = self._read_at(self._offsets[_id], f)
+                if matches(document, filter):
+                    results.append(document)
+                    if limit and len(results) >= limit:
+                        break
+        return results
+
+    def find(self, filter=None, limit=0):
+        with self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+            return self._find(filter or {}, limit)
+
+    def page(self, position, limit):
+        """Return up to limit documents in insertion order and the next position"""
+        with self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+            ids = self._order[position:position + limit]
+            documents = []
+            if ids:
+                with open(self.path, "rb") as f:
+                    documents = [self._read_at(self._offsets[_id], f) for _id in ids]
+            end = position + len(ids)
+            return documents, (end if end < len(self._order) else None)
+
+    def scan(self, filter, position, limit):
+        """Return up to limit documents matching filter, in insertion order from
+        position, and the position to continue from"""
+        with self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+            documents = []
+            if position >= len(self._order):
+                return documents, None
+            with open(self.path, "rb") as f:
+                while position < len(self._order) and len(documents) < limit:
+                    document = self._read_at(self._offsets[self._order[position]], f)
+                    position += 1
+                    if matches(document, filter):
+                        documents.append(document)
+            return documents, (position if position < len(self._order) else None)
+
+    def insert(self, document):
+        document.setdefault("_id", str(ObjectId()))
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            self._append(document)
+        return document["_id"]
+
+    def insert_many(self, documents):
+        """Append documents under one lock; returns indexes of _ids already present"""
+        duplicates = set()
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            for index, document in enumerate(documents):
+                document.setdefault("_id", str(ObjectId()))
+                if document["_id"] in self._offsets:
+                    duplicates.add(index)
+                else:
+                    self._append(document)
+        return duplicates
+
+    def set_many(self, updates):
+        # Repeated _ids are merged so a later update does not overwrite an earlier one
+        merged = {}
+        for _id, fields in updates:
+            merged.setdefault(_id, {}).update(fields)
+        modified = 0
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            with open(self.path, "rb") as f:
+                documents = [(self._read_at(self._offsets[_id], f), fields)
+                             for _id, fields in merged.items() if _id in self._offsets]
+            for document, fields in documents:
+                document.update(fields)
+                self._append(document)
+                modified += 1
+        self.maybe_compact()
+        return modified
+
+    def increment_many(self, updates):
+        """Upsert (_id, increments, defaults) triples in one locked pass"""
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            for _id, increments, defaults in updates:
+                if _id in self._offsets:
+                    document = self._read_at(self._offsets[_id])
+                else:
+                    document = dict(defaults, _id=_id)
+                for path, amount in increments.items():
+                    increment(document, path, amount)
+                self._append(document)
+        self.maybe_compact()
+        return len(updates)
+
+    def update(self, filter, update):
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            found = self._find(filter, 1)
+            if not found:
+                return 0
+            document = found[0]
+            apply_update(document, update)
+            self._append(document)
+        self.maybe_compact()
+        return 1
+
+    def sync(self):
+        """Flush any batched writes to disk"""
+        with self._file_lock(fcntl.LOCK_EX):
+            if self._pending_sync and self.path.exists():
+                with open(self.path, "ab") as f:
+                    os.fsync(f.fileno())
+                self._pending_sync = 0
+                self._last_sync = time.monotonic()
+
+    def garbage(self):
+        return self._lines - len(self._offsets)
+
+    def maybe_compact(self):
+        garbage = self.garbage()
+        if garbage >= COMPACT_MIN_GARBAGE and garbage > COMPACT_RATIO * len(self._offsets):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log with only the newest version of each record"""
+        with self._file_lock(fcntl.LOCK_EX):
+            self._catch_up()
+            tmp = self.path.with_suffix(".compact")
+            with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                for _id in self._order:
+                    src.seek(self._offsets[_id])
+                    dst.write(src.readline())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp, self.path)
+            self._reset()
+            self._catch_up()
+            self._pending_sync = 0
@@ -0,0 +1,121 @@
+import os
+import time
+import asyncio
+import tempfile
+from pydantic import ValidationError
+from app.models import Player
+from app.responses import dumps
+
+# Batch validation of player records, e.g. a roster checked before import.
+# Records are checked against Player, the same model as /validate-player, and
+# validated VALIDATE_CHUNK_SIZE at a time off the event loop. NDJSON bodies are
+# read line by line as they arrive, and each raw line goes straight to the
+# model's compiled validator, so it is never built into a Python dict first; a
+# JSON array is parsed off the event loop and its elements validated as values.
+# Results, one NDJSON line per record and a closing summary, are spooled while
+# the body is read and streamed back afterwards: a streaming response listens
+# on the same channel for the client disconnecting, so it must not start while
+# the body is still being received.
+VALIDATE_CHUNK_SIZE = int(os.getenv("VALIDATE_CHUNK_SIZE", "1000"))
+VALIDATE_MAX_RECORDS = int(os.getenv("VALIDATE_MAX_RECORDS", "100000"))
+VALIDATE_SPOOL_BYTES = 1024 * 1024
+VALIDATE_READ_SIZE = 64 * 1024
+
+
+def validation_message(error: ValidationError):
+    return "; ".join(f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail["loc"]
+                     else detail["msg"] for detail in error.errors())
+
+
+def validate_chunk(records):
+    """Validate (row, record) pairs, where a record is a raw NDJSON line (bytes)
+    or a parsed value. Returns the encoded result lines and the number of invalid records."""
+    lines, invalid = [], 0
+    for row, record in records:
+        try:
+            if isinstance(record, bytes):
+                Player.model_validate_json(record)
+            else:
+                Player.model_validate(record)
+            result = {"row": row, "valid": True}
+        except ValidationError as e:
+            invalid += 1
+            result = {"row": row, "valid": False, "error": validation_message(e)}
+        lines.append(dumps(result))
+    return b"\n".join(lines) + b"\n", invalid
+
+
+async def ndjson_records(chunks):
+    """(line number, line) pairs from an async iterable of NDJSON body chunks,
+    skipping blank lines"""
+    number, pending = 0, b""
+    async for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if pending.strip():
+        yield number + 1, pending
+
+
+async def array_records(records):
+    """(position, element) pairs from a parsed JSON array"""
+    for pair in enumerate(records, start=1):
+        yield pair
+
+
+async def validate_stream(records, chunk_size=VALIDATE_CHUNK_SIZE, max_records=VALIDATE_MAX_RECORDS):
+    """Yield NDJSON results for an async iterable of (row, record) pairs a chunk
+    at a time, then a {"summary": ...} line. Records past max_records are not validated."""
+    summary = {"records": 0, "valid": 0, "invalid": 0, "truncated": False}
+    started = time.perf_counter()
+    chunk = []
+
+    async def flush():
+        data, invalid = await asyncio.to_thread(validate_chunk, chunk)
+        summary["records"] += len(chunk)
+        summary["invalid"] += invalid
+        summary["valid"] += len(chunk) - invalid
+        chunk.clear()
+        return data
+
+    async for pair in records:
+        if summary["records"] + len(chunk) >= max_records:
+            summary["truncated"] = True
+            break
+        chunk.append(pair)
+        if len(chunk) >= chunk_size:
+            yield await flush()
+    if chunk:
+        yield await flush()
+
+    elapsed = time.perf_counter() - started
+    yield dumps({"summary": dict(summary, seconds=round(elapsed, 2),
+                                 records_per_sec=round(summary["records"] / elapsed) if elapsed else 0)}) + b"\n"
+
+
+async def spool_results(records):
+    """Validate records into a temporary file of NDJSON results, rewound for reading"""
+    results = tempfile.SpooledTemporaryFile(max_size=VALIDATE_SPOOL_BYTES)
+    try:
+        async for data in validate_stream(records):
+            await asyncio.to_thread(results.write, data)
+    except BaseException:
+        results.close()
+        raise
+    results.seek(0)
+    return results
+
+
+async def read_results(results):
+    """Stream a spooled results file, closing it at the end"""
+    try:
+        while True:
+            data = await asyncio.to_thread(results.read, VALIDATE_READ_SIZE)
+            if not data:
+                break
+            yield data
+    finally:
+        results.close()
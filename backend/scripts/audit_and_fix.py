@@ -1,34 +1,142 @@
-from pymongo import MongoClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
+import argparse
+import json
 import os
+import sys
+import time
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
-client = MongoClient(os.getenv("MONGO_URI"))
-db = client.enejistats
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.mongo import get_database
+
+db = get_database()
 players_collection = db.players
+counters_collection = db.counters
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHECKPOINT = "audit_and_fix.checkpoint.json"
+PLACEHOLDER_PHOTO = "https://via.placeholder.com/150"
+
+# Only documents missing one of these fields need fixing
+NEEDS_FIX = {"$or": [
+    {"photo": {"$exists": False}},
+    {"middleName": {"$exists": False}},
+    {"player_id": {"$exists": False}},
+]}
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return ObjectId(json.load(f)["last_id"])
+    return None
 
-def audit_and_fix_players():
-    players = players_collection.find()
-    for player in players:
-        updates = {}
 
-        if "photo_url" not in player:
-            updates["photo_url"] = "https://via.placeholder.com/150"
+def save_checkpoint(path, last_id):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"last_id": str(last_id)}, f)
+    os.replace(tmp, path)
 
-        if "middle_name" not in player:
-            updates["middle_name"] = ""
 
+def reserve_player_ids(count):
+    """Atomically reserve count sequential player ids from the counters collection"""
+    counter = counters_collection.find_one_and_update(
+        {"_id": "player_id"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    first = counter["seq"] - count + 1
+    return [f"EJ{n:07d}" for n in range(first, counter["seq"] + 1)]
+
+
+def build_updates(batch, dry_run=False):
+    """Return (_id, $set fields) pairs for a batch of players"""
+    missing_ids = sum(1 for player in batch if "player_id" not in player)
+    if dry_run:
+        new_ids = iter(f"<new-id-{n}>" for n in range(missing_ids))
+    else:
+        new_ids = iter(reserve_player_ids(missing_ids) if missing_ids else [])
+
+    updates = []
+    for player in batch:
+        fields = {}
+        if "photo" not in player:
+            fields["photo"] = PLACEHOLDER_PHOTO
+        if "middleName" not in player:
+            fields["middleName"] = ""
         if "player_id" not in player:
-            # Generate unique ID (use a real generator in production)
-            updates["player_id"] = str(player["_id"])[-5:]  # Example
+            fields["player_id"] = next(new_ids)
+        if fields:
+            updates.append((player["_id"], fields))
+    return updates
+
+
+def audit_and_fix_players(batch_size=DEFAULT_BATCH_SIZE, dry_run=False, checkpoint=DEFAULT_CHECKPOINT):
+    last_id = load_checkpoint(checkpoint)
+    if last_id:
+        print(f"Resuming after {last_id}")
+
+    projection = {"photo": 1, "middleName": 1, "player_id": 1}
+    scanned = fixed = errors = 0
+    started = time.monotonic()
+
+    while True:
+        query = dict(NEEDS_FIX)
+        if last_id:
+            query["_id"] = {"$gt": last_id}
+        batch = list(players_collection.find(query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        updates = build_updates(batch, dry_run)
+        if dry_run:
+            for _id, fields in updates:
+                print(f"Would fix player {_id}: {fields}")
+        elif updates:
+            try:
+                result = players_collection.bulk_write(
+                    [UpdateOne({"_id": _id}, {"$set": fields}) for _id, fields in updates],
+                    ordered=False
+                )
+                fixed += result.modified_count
+            except BulkWriteError as e:
+                fixed += e.details.get("nModified", 0)
+                errors += len(e.details.get("writeErrors", []))
+                for error in e.details.get("writeErrors", []):
+                    print(f"Failed to fix player {updates[error['index']][0]}: {error['errmsg']}")
+
+        scanned += len(batch)
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            save_checkpoint(checkpoint, last_id)
+
+        elapsed = time.monotonic() - started
+        print(f"Scanned {scanned}, fixed {fixed}, errors {errors} ({scanned / elapsed:.0f} docs/sec)")
+
+    if not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    elapsed = time.monotonic() - started
+    rate = scanned / elapsed if elapsed else 0
+    return {"scanned": scanned, "fixed": fixed, "errors": errors, "seconds": round(elapsed, 2), "docs_per_sec": round(rate)}
 
-        if updates:
-            print(f"Fixing player {player.get('_id')}: {updates}")
-            players_collection.update_one(
-                {"_id": player["_id"]},
-                {"$set": updates}
-            )
 
 if __name__ == "__main__":
-    audit_and_fix_players()
-    print("✔️ Player collection audit completed.")
+    parser = argparse.ArgumentParser(description="Backfill missing player fields in bulk")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Report fixes without writing")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    summary = audit_and_fix_players(args.batch_size, args.dry_run, args.checkpoint)
+    print(f"✔️ Player collection audit completed: {summary}")
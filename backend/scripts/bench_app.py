@@ -0,0 +1,319 @@
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Load benchmark for the whole app. Each (storage, concurrency) pair runs in a
+# fresh child process with its own scratch directory, so peak RSS and the
+# JSON files start clean every time. The child imports the app, seeds players,
+# runs the startup handlers and drives it through httpx's ASGI transport
+# (in-process, no sockets) with a closed loop of workers that each pick the
+# next request from the weighted mix. Results go to a JSON file; --compare
+# prints throughput and tail latency changes against an earlier file.
+#
+# storage=mongodb writes into the enejistats database of --mongo-uri, so point
+# it at a scratch mongod only.
+STORAGES = ("json", "mongomock", "mongodb")
+DEFAULT_STORAGES = ["json", "mongomock"]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+DEFAULT_DURATION = 10.0
+DEFAULT_WARMUP = 2.0
+DEFAULT_SEED_PLAYERS = 500
+DEFAULT_SESSIONS = 20
+DEFAULT_OUTPUT = "bench-results.json"
+PASSWORD = "bench-password"
+
+# Scenario weights. "dashboard" requests /player-dashboard: /dashboard renders
+# a template that does not exist, so it would only measure the error path.
+MIXES = {
+    "default": {"static": 50, "registrations": 20, "dashboard": 15, "login": 10, "register": 5},
+    "browse": {"static": 70, "registrations": 30},
+    "auth": {"login": 50, "dashboard": 40, "register": 10},
+}
+EXPECTED_STATUS = {"static": 200, "registrations": 200, "dashboard": 200, "login": 302, "register": 303}
+STATIC_PAGES = ["/", "/about", "/contact", "/register", "/leaderboard"]
+STATIC_ASSETS = ["css/styles.css", "js/main.js"]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def seed_document(i, hashed):
+    return {
+        "userType": "player",
+        "firstName": f"Seed{i}",
+        "middleName": "",
+        "lastName": f"Player{i}",
+        "email": f"seed{i}@bench.local",
+        "password": hashed,
+        "dob": "2001-05-05",
+        "gender": "male",
+        "nationality": "Nigeria",
+        "photo": None,
+        "preferredPositionCategory": "Midfielder",
+        "preferredPosition": "Central Midfielder",
+        "otherPositions": ["Defensive Midfielder"],
+        "dominantFoot": "right",
+        "height": 178,
+        "weight": 72,
+        "league": "street",
+        "club": f"Club {i % 20}",
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+
+
+def registration_form():
+    # Registration rejects a repeated email or first+last name
+    token = uuid.uuid4().hex
+    return {
+        "userType": "player",
+        "firstName": f"Bench{token[:12]}",
+        "lastName": f"Runner{token[12:]}",
+        "email": f"bench-{token}@bench.local",
+        "password": PASSWORD,
+        "confirmPassword": PASSWORD,
+        "gender": "male",
+        "playerNationality": "Nigeria",
+        "preferredPositionCategory": "Forward",
+        "preferredPosition": "Striker",
+        "dominantFoot": "right",
+        "height": "180",
+        "weight": "75",
+        "league": "street",
+        "generalClub": "Bench FC",
+    }
+
+
+def prepare_environment(storage, mongo_uri, bcrypt_rounds):
+    """Point the app at the chosen storage before it is imported"""
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if bcrypt_rounds:
+        os.environ["BCRYPT_ROUNDS"] = str(bcrypt_rounds)
+    if storage == "json":
+        os.environ["MONGO_URI"] = ""
+    elif storage == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("storage=mongomock needs the mongomock package (pip install mongomock)")
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        os.environ["MONGO_URI"] = "mongodb://mongomock"
+    else:
+        if not mongo_uri:
+            sys.exit("storage=mongodb needs --mongo-uri pointing at a scratch server")
+        os.environ["MONGO_URI"] = mongo_uri
+
+    # The app resolves static/, templates/ and its JSON files relative to the
+    # working directory, so run from a scratch copy
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    ignore = shutil.ignore_patterns("uploads", "dist", "__pycache__")
+    shutil.copytree(BACKEND_DIR / "static", workdir / "static", ignore=ignore)
+    shutil.copytree(BACKEND_DIR / "templates", workdir / "templates")
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+    return workdir
+
+
+def summarize(samples, elapsed):
+    import numpy as np
+
+    latencies = np.array([latency for _, latency, _ in samples]) * 1000
+    errors = sum(1 for scenario, _, status in samples if status != EXPECTED_STATUS[scenario])
+    if not len(latencies):
+        return {"requests": 0, "errors": 0, "throughput_rps": 0.0, "latency_ms": {}}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(float(latencies.mean()), 3),
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(latencies.max()), 3),
+        },
+    }
+
+
+async def drive(args):
+    import httpx
+    from app.main import app, players
+    from app.assets import asset
+    from app.passwords import hash_password
+
+    hashed = await hash_password(PASSWORD)
+    await players.insert_many([seed_document(i, hashed) for i in range(args.seed_players)])
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        # Sessions are passed explicitly, so the client itself keeps no cookies
+        no_cookies = http.cookiejar.CookieJar(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies=no_cookies) as client:
+            sessions = []
+            for i in range(min(args.sessions, args.seed_players)):
+                response = await client.post("/login", data={"email": f"seed{i}@bench.local", "password": PASSWORD})
+                sessions.append(response.cookies["access_token"])
+            static_urls = STATIC_PAGES + [asset(path) for path in STATIC_ASSETS]
+
+            async def request(scenario, rng):
+                if scenario == "static":
+                    return await client.get(rng.choice(static_urls), headers={"Accept-Encoding": "gzip, br"})
+                if scenario == "registrations":
+                    return await client.get("/registrations", params={"limit": 50})
+                if scenario == "dashboard":
+                    return await client.get("/player-dashboard",
+                                            headers={"Cookie": f"access_token={rng.choice(sessions)}"})
+                if scenario == "login":
+                    i = rng.randrange(args.seed_players)
+                    return await client.post("/login", data={"email": f"seed{i}@bench.local", "password": PASSWORD})
+                return await client.post("/register", data=registration_form())
+
+            mix = MIXES[args.mix]
+            scenarios, weights = list(mix), list(mix.values())
+            samples = []
+            start = time.perf_counter()
+            measure_from = start + args.warmup
+            stop = measure_from + args.duration
+
+            async def worker(index):
+                rng = random.Random(args.seed * 1000 + index)
+                while True:
+                    began = time.perf_counter()
+                    if began >= stop:
+                        return
+                    scenario = rng.choices(scenarios, weights)[0]
+                    response = await request(scenario, rng)
+                    if began >= measure_from:
+                        samples.append((scenario, time.perf_counter() - began, response.status_code))
+
+            await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+            elapsed = time.perf_counter() - measure_from
+
+    result = {"storage": args.storage, "concurrency": args.concurrency, "mix": args.mix,
+              "duration_s": round(elapsed, 2)}
+    result.update(summarize(samples, elapsed))
+    result["scenarios"] = {
+        scenario: summarize([s for s in samples if s[0] == scenario], elapsed) for scenario in scenarios
+    }
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_child(args):
+    workdir = prepare_environment(args.storage, args.mongo_uri, args.bcrypt_rounds)
+    try:
+        result = asyncio.run(drive(args))
+    finally:
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(result))
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    runs = []
+    for storage in args.storage:
+        for concurrency in args.concurrency:
+            command = [sys.executable, __file__, "--child", "--storage", storage, "--concurrency", str(concurrency),
+                       "--mix", args.mix, "--duration", str(args.duration), "--warmup", str(args.warmup),
+                       "--seed-players", str(args.seed_players), "--sessions", str(args.sessions),
+                       "--seed", str(args.seed)]
+            if args.mongo_uri:
+                command += ["--mongo-uri", args.mongo_uri]
+            if args.bcrypt_rounds:
+                command += ["--bcrypt-rounds", str(args.bcrypt_rounds)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                sys.stderr.write(completed.stderr)
+                sys.exit(f"benchmark failed for storage={storage} concurrency={concurrency}")
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+            runs.append(run)
+            latency = run["latency_ms"]
+            print(f"{storage:<10} c={concurrency:<4} {run['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {latency.get('p50', 0):>8.2f}  p95 {latency.get('p95', 0):>8.2f}  "
+                  f"p99 {latency.get('p99', 0):>8.2f} ms  errors {run['errors']:<5} rss {run['peak_rss_mb']} MB")
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "mix": args.mix, "weights": MIXES[args.mix], "duration_s": args.duration, "warmup_s": args.warmup,
+            "seed_players": args.seed_players, "sessions": args.sessions, "seed": args.seed,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "runs": runs,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}")
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+def compare(baseline, current):
+    """Print throughput and tail latency change per (storage, concurrency) run"""
+    previous = {(run["storage"], run["concurrency"]): run for run in baseline["runs"]}
+    print(f"Compared with {baseline.get('commit') or 'baseline'}:")
+    for run in current["runs"]:
+        before = previous.get((run["storage"], run["concurrency"]))
+        if before is None or not before["throughput_rps"]:
+            continue
+        changes = [f"throughput {run['throughput_rps'] / before['throughput_rps'] - 1:+.1%}"]
+        for key in ("p95", "p99"):
+            if before["latency_ms"].get(key):
+                changes.append(f"{key} {run['latency_ms'][key] / before['latency_ms'][key] - 1:+.1%}")
+        changes.append(f"rss {run['peak_rss_mb'] - before['peak_rss_mb']:+.1f} MB")
+        print(f"  {run['storage']:<10} c={run['concurrency']:<4} " + "  ".join(changes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the app in-process and record latency and throughput")
+    parser.add_argument("--storage", nargs="+", choices=STORAGES, default=DEFAULT_STORAGES)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP, help="unmeasured seconds before each run")
+    parser.add_argument("--seed-players", type=int, default=DEFAULT_SEED_PLAYERS)
+    parser.add_argument("--sessions", type=int, default=DEFAULT_SESSIONS, help="logged-in players for dashboard")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the request mix")
+    parser.add_argument("--bcrypt-rounds", type=int, help="override BCRYPT_ROUNDS (default: the app's)")
+    parser.add_argument("--mongo-uri", help="scratch server for storage=mongodb")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        args.storage = args.storage[0]
+        args.concurrency = args.concurrency[0]
+        run_child(args)
+    else:
+        run_suite(args)
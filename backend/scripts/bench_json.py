@@ -0,0 +1,77 @@
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from bson.objectid import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.responses import FastJSONResponse
+from app.compression import brotli, compress
+
+# Compares the stock FastAPI JSON path (jsonable_encoder + stdlib json) with
+# FastJSONResponse for a /registrations-sized page, and the wire size of the
+# same body with the dynamic gzip/brotli settings CompressionMiddleware uses.
+DEFAULT_PLAYERS = 200
+DEFAULT_ROUNDS = 200
+
+
+def sample_players(count):
+    created = datetime(2025, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "player_id": f"EJ{i:07d}",
+        "userType": "player",
+        "firstName": f"First{i}",
+        "middleName": "",
+        "lastName": f"Last{i}",
+        "dob": "2001-05-05",
+        "gender": "male",
+        "nationality": "Nigeria",
+        "photo": f"{i:064x}.jpg",
+        "preferredPositionCategory": "Midfielder",
+        "preferredPosition": "Central Midfielder",
+        "otherPositions": ["Defensive Midfielder", "Attacking Midfielder"],
+        "dominantFoot": "right",
+        "height": 178,
+        "weight": 72,
+        "league": "Nigerian Professional Football League",
+        "club": "Rivers United",
+        "created_at": created + timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = func()
+    return (time.perf_counter() - start) / rounds * 1000, result
+
+
+def run(count, rounds):
+    players = sample_players(count)
+    payload = {"registrations": players, "next_cursor": str(count), "source": "mongodb"}
+
+    # The stock path needs ObjectId converted, as routes had to do before
+    stock_ms, stock_body = timed(
+        lambda: JSONResponse(jsonable_encoder(payload, custom_encoder={ObjectId: str})).body, rounds)
+    fast_ms, fast_body = timed(lambda: FastJSONResponse(payload).body, rounds)
+    print(f"{count} players, {rounds} rounds")
+    print(f"  jsonable_encoder + json : {stock_ms:8.3f} ms  {len(stock_body):>8} bytes")
+    print(f"  FastJSONResponse        : {fast_ms:8.3f} ms  {len(fast_body):>8} bytes  ({stock_ms / fast_ms:.1f}x)")
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    for encoding in encodings:
+        compress_ms, compressed = timed(lambda: compress(fast_body, encoding), rounds)
+        print(f"  + {encoding:<4} compression    : {compress_ms:8.3f} ms  {len(compressed):>8} bytes"
+              f"  ({len(compressed) / len(fast_body):.0%} of uncompressed)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialisation and response compression")
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    args = parser.parse_args()
+    run(args.players, args.rounds)
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.db import MongoCollection, shutdown_executor
+from app.export import (EXPORT_BATCH_SIZE, MATCH_STATS_COLUMNS, PLAYER_COLUMNS, PRIVATE_PLAYER_COLUMNS,
+                        export_formats, export_stream, match_stats_filter, player_filter, select_columns)
+from app.mongo import close_client, get_database
+
+# Exports players or match stats from MongoDB to a CSV or Parquet file with the
+# same batching as the /api/export endpoints. Unlike the endpoints, players'
+# email can be included with --include-email; passwords never are.
+
+
+async def run(args):
+    db = get_database()
+    if args.dataset == "players":
+        collection = MongoCollection(db["players"])
+        types = PLAYER_COLUMNS
+        private = () if args.include_email else PRIVATE_PLAYER_COLUMNS
+        fields = args.fields
+        if args.include_email and fields and "email" not in fields.split(","):
+            fields += ",email"
+        columns = select_columns(PLAYER_COLUMNS, fields, private)
+        filter = player_filter("mongodb", args.league, args.date_from, args.date_to)
+    else:
+        collection = MongoCollection(db["match_stats"], object_ids=False)
+        types = MATCH_STATS_COLUMNS
+        columns = select_columns(MATCH_STATS_COLUMNS, args.fields)
+        filter = match_stats_filter(args.league, args.date_from, args.date_to, args.player_id)
+
+    output = args.output or f"{args.dataset}.{args.format}"
+    written = 0
+    started = time.monotonic()
+    with open(output, "wb") as f:
+        async for chunk in export_stream(collection, filter, columns, types, args.format, args.batch_size):
+            f.write(chunk)
+            written += len(chunk)
+    return output, written, time.monotonic() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export players or match stats as CSV or Parquet")
+    parser.add_argument("dataset", choices=["players", "match-stats"])
+    parser.add_argument("--format", choices=export_formats(), default="csv")
+    parser.add_argument("--output", help="Defaults to <dataset>.<format>")
+    parser.add_argument("--fields", help="Comma separated columns (default: all public columns)")
+    parser.add_argument("--league")
+    parser.add_argument("--player-id", help="Match stats only")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                        help="Earliest created_at (players) or match_date (match stats), YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Latest date, inclusive")
+    parser.add_argument("--include-email", action="store_true", help="Include players' email addresses")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    try:
+        output, written, elapsed = asyncio.run(run(args))
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        shutdown_executor()
+        close_client()
+    print(f"✔️ Exported {args.dataset} to {output} ({written} bytes in {elapsed:.1f}s)")
@@ -0,0 +1,47 @@
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.db import MongoCollection, shutdown_executor
+from app.importer import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_format, import_players, read_rows
+from app.mongo import close_client, get_database
+
+# Imports a CSV or NDJSON roster straight into MongoDB with the same chunked
+# validation, duplicate checks and unordered inserts as POST /api/players/import.
+# A running app picks the new players up in its search index on next restart.
+
+
+async def run(path, format, chunk_size):
+    players = MongoCollection(get_database()["players"])
+    summary = {}
+    with open(path, encoding="utf-8-sig", newline="") as text:
+        async for event in import_players(players, read_rows(text, format), chunk_size):
+            if "progress" in event:
+                summary = event["progress"]
+                print(f"Read {summary['rows']}, inserted {summary['inserted']}, invalid {summary['invalid']}, "
+                      f"duplicates {summary['duplicates']} ({summary['rows_per_sec']} rows/sec)")
+            else:
+                print(f"Row {event['row']}: {event['error']}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import players from a CSV or NDJSON roster")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    roster_format = import_format(args.path, args.format)
+    if roster_format is None:
+        parser.error("cannot tell the format from the extension; pass --format")
+    try:
+        summary = asyncio.run(run(args.path, roster_format, args.chunk_size))
+    finally:
+        shutdown_executor()
+        close_client()
+    print(f"✔️ Roster import completed: {summary}")
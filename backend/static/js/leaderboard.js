@@ -1,46 +1,66 @@
-const players = Array.from({ length: 87 }, (_, i) => ({
-  id: i + 1,
-  rank: i + 1,
-  name: `Player ${i + 1}`,
-  position: ["Striker", "Midfielder", "Defender", "Goalkeeper"][i % 4],
-  score: (Math.random() * 30 + 70).toFixed(1),
-  img: `https://via.placeholder.com/60?text=P${i + 1}`
-}));
-
-let currentWeek = 1;
+let weeks = [];
+let currentWeek = null;
 let currentPage = 1;
+let searchTimer = null;
 const perPage = 20;
 
-function renderLeaderboard(data, page) {
+async function loadLeaderboard() {
+  const params = new URLSearchParams({ page: currentPage, per_page: perPage });
+  if (currentWeek) params.set("week", currentWeek);
+  const position = document.getElementById("positionFilter").value;
+  if (position) params.set("position", position);
+  const term = document.getElementById("searchInput").value.trim();
+  if (term) params.set("q", term);
+
+  const response = await fetch(`/api/leaderboard?${params}`);
+  const data = await response.json();
+  weeks = data.weeks;
+  currentWeek = data.week;
+  document.getElementById("weekDisplay").textContent = currentWeek ? `Week ${currentWeek}` : "No results yet";
+  renderLeaderboard(data.players);
+  renderPagination(data.total, currentPage);
+}
+
+function renderLeaderboard(pageData) {
   const container = document.getElementById("leaderboard");
   container.innerHTML = "";
 
-  const start = (page - 1) * perPage;
-  const end = start + perPage;
-  const pageData = data.slice(start, end);
-
   pageData.forEach(player => {
+    // Names, positions and photos come from players, so they are only ever set as text or properties
     const row = document.createElement("div");
     row.className = "leaderboard-row";
     row.onclick = () => {
-      window.location.href = `player-dashboard.html?id=${player.id}`;
+      window.location.href = `/player-dashboard?id=${encodeURIComponent(player.player_id)}`;
     };
-    row.innerHTML = `
-      <div class="rank">${player.rank}</div>
-      <img class="player-photo" src="${player.img}" alt="${player.name}">
-      <div class="player-info">
-        <h4>${player.name}</h4>
-        <p>${player.position}</p>
-      </div>
-      <div class="score-card">${player.score}</div>
-    `;
+
+    const rank = document.createElement("div");
+    rank.className = "rank";
+    rank.textContent = player.rank;
+
+    const img = document.createElement("img");
+    img.className = "player-photo";
+    img.src = player.img || "https://via.placeholder.com/60";
+    img.alt = player.name || "";
+    img.loading = "lazy";
+
+    const info = document.createElement("div");
+    info.className = "player-info";
+    const name = document.createElement("h4");
+    name.textContent = player.name || "Unknown player";
+    const position = document.createElement("p");
+    position.textContent = player.position || "";
+    info.append(name, position);
+
+    const score = document.createElement("div");
+    score.className = "score-card";
+    score.textContent = player.score.toFixed(1);
+
+    row.append(rank, img, info, score);
     container.appendChild(row);
   });
-
-  renderPagination(data.length, page);
 }
 
-function renderPagination(totalItems, currentPage) {
+function renderPagination(totalItems, page) {
   const pageCount = Math.ceil(totalItems / perPage);
   const container = document.getElementById("pagination");
   container.innerHTML = "";
@@ -48,29 +68,36 @@ function renderPagination(totalItems, currentPage) {
   for (let i = 1; i <= pageCount; i++) {
     const btn = document.createElement("button");
     btn.textContent = i;
-    if (i === currentPage) btn.classList.add("active");
+    if (i === page) btn.classList.add("active");
     btn.onclick = () => {
       currentPage = i;
-      filterPlayers();
+      loadLeaderboard();
     };
     container.appendChild(btn);
   }
 }
 
 function filterPlayers() {
-  const term = document.getElementById("searchInput").value.toLowerCase();
-  const filtered = players.filter(p =>
-    p.name.toLowerCase().includes(term) || p.position.toLowerCase().includes(term)
-  );
-  renderLeaderboard(filtered, currentPage);
+  // The search runs on the server across the whole board, so wait for typing to pause
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => {
+    currentPage = 1;
+    loadLeaderboard();
+  }, 250);
+}
+
+function changePosition() {
+  currentPage = 1;
+  loadLeaderboard();
 }
 
 function changeWeek(delta) {
-  currentWeek += delta;
-  if (currentWeek < 1) currentWeek = 1;
-  document.getElementById("weekDisplay").textContent = "Week " + currentWeek;
-  alert("Mock: Week " + currentWeek + " data loaded.");
+  const index = weeks.indexOf(currentWeek) + delta;
+  if (index < 0 || index >= weeks.length) return;
+  currentWeek = weeks[index];
+  currentPage = 1;
+  loadLeaderboard();
 }
 
 document.getElementById("year").textContent = new Date().getFullYear();
-renderLeaderboard(players, currentPage);
+loadLeaderboard();
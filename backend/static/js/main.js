@@ -7,14 +7,40 @@ setInterval(() => {
    Browse script starts here
    ===================== */
 
+let browseTimer = null;
+
 function filterPlayers() {
-  const input = document.getElementById("searchInput").value.toLowerCase();
-  const cards = document.querySelectorAll(".player-card");
+  const input = document.getElementById("searchInput").value.trim();
+  if (input.length < 2) return;
+
+  clearTimeout(browseTimer);
+  browseTimer = setTimeout(async () => {
+    const response = await fetch(`/api/players/search?q=${encodeURIComponent(input)}&limit=24`);
+    const data = await response.json();
+    const grid = document.getElementById("playerGrid");
+    grid.innerHTML = "";
+
+    data.results.forEach(player => {
+      // Search results echo player-entered text, so it is only ever set as text or properties
+      const card = document.createElement("a");
+      card.className = "player-card";
+      card.href = `/player-dashboard?id=${encodeURIComponent(player.player_id)}`;
+
+      const img = document.createElement("img");
+      img.src = player.img || "https://via.placeholder.com/100";
+      img.alt = player.name || "";
+      img.loading = "lazy";
+      const name = document.createElement("h4");
+      name.textContent = player.name;
+      const club = document.createElement("p");
+      club.textContent = `Club: ${player.club || "-"}`;
+      const position = document.createElement("p");
+      position.textContent = `Position: ${player.position || "-"}`;
 
-  cards.forEach(card => {
-    const name = card.querySelector("h4").textContent.toLowerCase();
-    card.style.display = name.includes(input) ? "block" : "none";
-  });
+      card.append(img, name, club, position);
+      grid.appendChild(card);
+    });
+  }, 150);
 }
 
 /* ==============================
@@ -13,11 +13,6 @@ let currentStats = {
 // Sample data
 const leagues = ['Nigerian Professional Football League', 'Nigerian National League One', 'Nigerian National League Two'];
 const teams = ['Rivers United', 'Enyimba', 'Kano Pillars', 'Plateau United', 'Akwa United'];
-const players = [
-  { id: 1, name: 'John Doe', position: 'ST', club: 'Rivers United' },
-  { id: 2, name: 'Jane Smith', position: 'CM', club: 'Enyimba' },
-  { id: 3, name: 'Mike Johnson', position: 'CB', club: 'Kano Pillars' }
-];
 
 // Initialize the widget
 document.addEventListener('DOMContentLoaded', function() {
@@ -72,8 +67,10 @@ function loadTeams() {
   });
 }
 
+let searchTimer = null;
+
 function searchPlayers() {
-  const searchTerm = document.getElementById('playerSearch').value.toLowerCase();
+  const searchTerm = document.getElementById('playerSearch').value.trim();
   const dropdown = document.getElementById('playerDropdown');
   
   if (searchTerm.length < 2) {
@@ -81,12 +78,21 @@ function searchPlayers() {
     return;
   }
   
-  const filteredPlayers = players.filter(player => 
-    player.name.toLowerCase().includes(searchTerm) ||
-    player.position.toLowerCase().includes(searchTerm) ||
-    player.club.toLowerCase().includes(searchTerm)
-  );
-  
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(() => {
+    fetch(`/api/players/search?q=${encodeURIComponent(searchTerm)}&limit=10`)
+      .then(response => response.json())
+      .then(data => renderPlayerOptions(data.results.map(result => ({
+        id: result.player_id,
+        name: result.name,
+        position: result.position || '',
+        club: result.club || ''
+      }))));
+  }, 150);
+}
+
+function renderPlayerOptions(filteredPlayers) {
+  const dropdown = document.getElementById('playerDropdown');
   dropdown.innerHTML = '';
   filteredPlayers.forEach(player => {
     const option = document.createElement('div');
@@ -167,11 +173,89 @@ function updateClockDisplay() {
   }
 }
 
+// Live match feed: every increment is sent as a sequenced event so
+// watchers see stats as they happen. Unacknowledged events stay in
+// liveFeed.pending and are resent after a reconnect or a sequence error.
+let liveFeed = { socket: null, matchId: null, seq: 0, pending: [] };
+
+function liveMatchId() {
+  const homeTeam = document.getElementById('homeTeam').value;
+  const awayTeam = document.getElementById('awayTeam').value;
+  const matchDate = document.getElementById('matchDate').value;
+  if (!homeTeam || !awayTeam || !matchDate) return null;
+  return `${matchDate}-${homeTeam}-${awayTeam}`.toLowerCase().replace(/[^a-z0-9-]+/g, '-');
+}
+
+function connectLiveFeed() {
+  const matchId = liveMatchId();
+  if (!matchId) return;
+  if (liveFeed.matchId === matchId && liveFeed.socket && liveFeed.socket.readyState <= WebSocket.OPEN) return;
+  if (liveFeed.matchId !== matchId) {
+    if (liveFeed.socket) liveFeed.socket.close();
+    liveFeed = { socket: null, matchId: matchId, seq: 0, pending: [] };
+  }
+
+  const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+  const socket = new WebSocket(`${protocol}://${window.location.host}/ws/matches/${encodeURIComponent(matchId)}`);
+  liveFeed.socket = socket;
+
+  socket.onmessage = (message) => {
+    const data = JSON.parse(message.data);
+    if (data.type === 'snapshot') {
+      restoreFromSnapshot(data);
+      resendPending(data.seq + 1);
+    } else if (data.type === 'ack') {
+      liveFeed.pending = liveFeed.pending.filter(event => event.seq > data.seq);
+    } else if (data.type === 'error') {
+      console.warn('Live feed error:', data.message);
+      resendPending(data.expected);
+    }
+  };
+  socket.onclose = () => {
+    if (liveFeed.socket === socket) {
+      liveFeed.socket = null;
+      setTimeout(connectLiveFeed, 2000);
+    }
+  };
+}
+
+function resendPending(expected) {
+  // Renumber anything the server has not applied so the sequence stays contiguous
+  liveFeed.seq = expected - 1;
+  liveFeed.pending.forEach(event => {
+    event.seq = ++liveFeed.seq;
+    liveFeed.socket.send(JSON.stringify(event));
+  });
+}
+
+function sendLiveEvent(event) {
+  connectLiveFeed();
+  event.seq = ++liveFeed.seq;
+  liveFeed.pending.push(event);
+  if (liveFeed.socket && liveFeed.socket.readyState === WebSocket.OPEN) {
+    liveFeed.socket.send(JSON.stringify(event));
+  }
+}
+
+function restoreFromSnapshot(snapshot) {
+  if (!selectedPlayer || liveFeed.pending.length) return;
+  const live = snapshot.players[String(selectedPlayer.id)];
+  if (!live) return;
+  Object.keys(currentStats).forEach(metric => {
+    currentStats[metric] = live.stats[metric] || 0;
+    document.getElementById(metric).textContent = currentStats[metric];
+  });
+  calculateLiveRating();
+}
+
 function updateMetric(metric, change) {
   if (currentStats.hasOwnProperty(metric)) {
     currentStats[metric] = Math.max(0, currentStats[metric] + change);
     document.getElementById(metric).textContent = currentStats[metric];
     calculateLiveRating();
+    if (selectedPlayer) {
+      sendLiveEvent({ type: 'stat', player_id: selectedPlayer.id, metric: metric, delta: change });
+    }
   }
 }
 
@@ -208,6 +292,7 @@ function handleSubstitution() {
   if (selectedPlayer && matchClock.minutes > 0) {
     const subTime = `${matchClock.minutes}:${String(matchClock.seconds).padStart(2, '0')}`;
     document.getElementById('substitutionTime').textContent = `Substituted at ${subTime}`;
+    sendLiveEvent({ type: 'substitution', player_id: selectedPlayer.id, minute: matchClock.minutes });
     alert(`${selectedPlayer.name} substituted at ${subTime}`);
   } else {
     alert('Please select a player and start the match clock first.');